@@ -23,7 +23,7 @@ resource_group = create_common_resources(
 )
 network = create_network_services(
     resource_group=resource_group,
-    location=resource_group.location.get(),
+    location=resource_group.location,
     tags=tags,
 )
 # storage = create_storage_services(
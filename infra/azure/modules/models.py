@@ -3,7 +3,7 @@ from dataclasses import dataclass
 import pulumi_azure_native as azure
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AzureResources:
     resource_group: (
         azure.resources.ResourceGroup
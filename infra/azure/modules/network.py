@@ -1,18 +1,92 @@
 from dataclasses import dataclass
 
+import pulumi
 import pulumi_azure_native as azure
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Network:
     vnet: azure.network.VirtualNetwork
     subnets: dict[str, azure.network.Subnet]
     sgs: dict[str, azure.network.NetworkSecurityGroup]
 
 
+def allow_inbound_tcp(
+    name: str, description: str, priority: int, port: str
+) -> azure.network.SecurityRuleArgs:
+    """
+    Create an inbound TCP allow rule from any source address and port
+
+    Args:
+        name (str): Rule name
+        description (str): Rule description
+        priority (int): Rule priority
+        port (str): Destination port range
+
+    Returns:
+        azure.network.SecurityRuleArgs: The security rule arguments
+    """
+    return azure.network.SecurityRuleArgs(
+        name=name,
+        description=description,
+        priority=priority,
+        direction=azure.network.SecurityRuleDirection.INBOUND,
+        access=azure.network.Access.ALLOW,
+        protocol=azure.network.SecurityRuleProtocol.TCP,
+        source_port_range="*",
+        destination_port_range=port,
+        source_address_prefix="*",
+        destination_address_prefix="*",
+    )
+
+
+# Inbound TCP rules per security group as (name, description, priority, port)
+NSG_RULES: dict[str, list[tuple[str, str, int, str]]] = {
+    "store": [("allow-https", "Allow HTTPS", 1010, "443")],
+    "cache": [("allow-redis-ssl", "Allow Redis SSL", 1000, "6380")],
+    "vault": [("allow-keyvault-https", "Allow Key Vault HTTPS", 1000, "443")],
+    "webapp": [
+        ("allow-http", "Allow HTTP", 1000, "80"),
+        ("allow-https", "Allow HTTPS", 1010, "443"),
+    ],
+}
+
+
+def make_nsg(
+    name: str,
+    resource_group: azure.resources.ResourceGroup,
+    location: pulumi.Input[str],
+    rules: list[azure.network.SecurityRuleArgs],
+    tags: dict[str, str],
+) -> azure.network.NetworkSecurityGroup:
+    """
+    Create a network security group with its rules inline
+
+    Keeping the rules on the group, rather than as separate SecurityRule
+    resources, submits them in a single API call.
+
+    Args:
+        name (str): Resource name
+        resource_group (azure.resources.ResourceGroup): Azure resource group
+        location (pulumi.Input[str]): Azure location
+        rules (list[azure.network.SecurityRuleArgs]): Security rules
+        tags (Dict[str, str]): Resource tags
+
+    Returns:
+        azure.network.NetworkSecurityGroup: The network security group
+    """
+    return azure.network.NetworkSecurityGroup(
+        name,
+        resource_group_name=resource_group.name,
+        location=location,
+        security_rules=rules,
+        tags=tags,
+    )
+
+
 def create_network_services(
     resource_group: azure.resources.ResourceGroup,
-    location: str,
+    location: pulumi.Input[str],
     tags: dict[str, str],
 ) -> Network:
     """
@@ -20,7 +94,8 @@ def create_network_services(
 
     Args:
         resource_group (azure.resources.ResourceGroup): Azure resource group
-        location (str): Azure location (e.g., "canadacentral")
+        location (pulumi.Input[str]): Azure location (e.g., "canadacentral"),
+            pass the resource group's location output to avoid blocking on it
         tags (Dict[str, str]): Resource tags
 
     Returns:
@@ -36,99 +111,16 @@ def create_network_services(
         tags=tags,
     )
 
+    # Each group gets all of its rules inline in one request
     sgs = {
-        "store": azure.network.NetworkSecurityGroup(
-            "store-sg",
-            resource_group_name=resource_group.name,
-            location=location,
-            security_rules=[
-                azure.network.SecurityRuleArgs(
-                    name="allow-https",
-                    description="Allow HTTPS",
-                    priority=1010,
-                    direction=azure.network.SecurityRuleDirection.INBOUND,
-                    access=azure.network.Access.ALLOW,
-                    protocol=azure.network.SecurityRuleProtocol.TCP,
-                    source_port_range="*",
-                    destination_port_range="443",
-                    source_address_prefix="*",
-                    destination_address_prefix="*",
-                ),
-            ],
-            tags=tags,
-        ),
-        "cache": azure.network.NetworkSecurityGroup(
-            "cache-sg",
-            resource_group_name=resource_group.name,
+        key: make_nsg(
+            f"{key}-sg",
+            resource_group=resource_group,
             location=location,
-            security_rules=[
-                azure.network.SecurityRuleArgs(
-                    name="allow-redis-ssl",
-                    description="Allow Redis SSL",
-                    priority=1000,
-                    direction=azure.network.SecurityRuleDirection.INBOUND,
-                    access=azure.network.Access.ALLOW,
-                    protocol=azure.network.SecurityRuleProtocol.TCP,
-                    source_port_range="*",
-                    destination_port_range="6380",
-                    source_address_prefix="*",
-                    destination_address_prefix="*",
-                )
-            ],
+            rules=[allow_inbound_tcp(*rule) for rule in rules],
             tags=tags,
-        ),
-        "vault": azure.network.NetworkSecurityGroup(
-            "vault-sg",
-            resource_group_name=resource_group.name,
-            location=location,
-            security_rules=[
-                azure.network.SecurityRuleArgs(
-                    name="allow-keyvault-https",
-                    description="Allow Key Vault HTTPS",
-                    priority=1000,
-                    direction=azure.network.SecurityRuleDirection.INBOUND,
-                    access=azure.network.Access.ALLOW,
-                    protocol=azure.network.SecurityRuleProtocol.TCP,
-                    source_port_range="*",
-                    destination_port_range="443",
-                    source_address_prefix="*",
-                    destination_address_prefix="*",
-                ),
-            ],
-            tags=tags,
-        ),
-        "webapp": azure.network.NetworkSecurityGroup(
-            "webapp-sg",
-            resource_group_name=resource_group.name,
-            location=location,
-            security_rules=[
-                azure.network.SecurityRuleArgs(
-                    name="allow-http",
-                    description="Allow HTTP",
-                    priority=1000,
-                    direction=azure.network.SecurityRuleDirection.INBOUND,
-                    access=azure.network.Access.ALLOW,
-                    protocol=azure.network.SecurityRuleProtocol.TCP,
-                    source_port_range="*",
-                    destination_port_range="80",
-                    source_address_prefix="*",
-                    destination_address_prefix="*",
-                ),
-                azure.network.SecurityRuleArgs(
-                    name="allow-https",
-                    description="Allow HTTPS",
-                    priority=1010,
-                    direction=azure.network.SecurityRuleDirection.INBOUND,
-                    access=azure.network.Access.ALLOW,
-                    protocol=azure.network.SecurityRuleProtocol.TCP,
-                    source_port_range="*",
-                    destination_port_range="443",
-                    source_address_prefix="*",
-                    destination_address_prefix="*",
-                ),
-            ],
-            tags=tags,
-        ),
+        )
+        for key, rules in NSG_RULES.items()
     }
 
     # Create subnets
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 import pulumi_azure_native as azure
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Storage:
     account: azure.storage.StorageAccount
     blob_container: azure.storage.BlobContainer
@@ -38,13 +38,13 @@ def create_storage_services(
         tags=tags,
     )
 
-    # Create a Blob Container
+    # Create a Blob Container, tags live on the storage account since Azure
+    # normalises container metadata and reports it as drift on every refresh
     blob_container = azure.storage.BlobContainer(
         "cnt",
         resource_group_name=resource_group.name,
         account_name=storage_account.name,
         public_access=azure.storage.PublicAccess.NONE,
-        metadata=tags,
     )
     return Storage(
         account=storage_account,
@@ -1,20 +1,101 @@
+import functools
 import os
+import re
+import threading
 import uuid
+from collections.abc import Callable
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import yaml
 from dotenv import load_dotenv
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, Template, nodes
 from openai import OpenAI
-from redis import Redis
 
 from models import AppConfig, ConverterParams
 
+if TYPE_CHECKING:
+    from redis import Redis
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader  # type: ignore[assignment]
+
 TEMPLATES_DIR = Path(__file__).parent
 
 app_config: None | AppConfig = None
-redis_client: None | Redis = None
+app_config_lock = threading.Lock()
+redis_client: "None | Redis" = None
+
+
+@functools.cache
+def get_config_template() -> Template:
+    """
+    Get the compiled configuration template.
+
+    The Jinja environment is created and the template compiled on first use
+    only, subsequent calls return the cached template.
+
+    Returns:
+        Template: The compiled configuration template.
+    """
+    env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)), auto_reload=False)
+    return env.get_template("config.yml.j2")
+
+
+@functools.cache
+def get_config_env_vars() -> tuple[str, ...]:
+    """
+    Get the environment variables referenced by the configuration template.
+
+    Returns:
+        tuple[str, ...]: The sorted variable names used as ``env.<NAME>``.
+    """
+    template = get_config_template()
+    source = (TEMPLATES_DIR / "config.yml.j2").read_text()
+    names = {
+        node.attr
+        for node in template.environment.parse(source).find_all(nodes.Getattr)
+        if isinstance(node.node, nodes.Name) and node.node.name == "env"
+    }
+    return tuple(sorted(names))
+
+
+@functools.lru_cache(maxsize=1)
+def render_config(env: tuple[tuple[str, str | None], ...]) -> dict[str, Any]:
+    """
+    Render the configuration template and parse it.
+
+    The result is cached on the values of the variables the template uses, so
+    reloading an unchanged environment skips both Jinja and YAML.
+
+    Args:
+        env (tuple[tuple[str, str | None], ...]): The template variables and
+            their values, None when unset.
+
+    Returns:
+        dict[str, Any]: The parsed configuration.
+    """
+
+    variables = {name: value for name, value in env if value is not None}
+    rendered_yaml: str = get_config_template().render(env=variables)
+
+    return yaml.load(rendered_yaml, Loader=YamlLoader)
+
+
+@functools.lru_cache(maxsize=4)
+def load_env_file(env_file: str, mtime: float | None) -> None:
+    """
+    Load a .env file into the environment.
+
+    Cached on the file's modification time so an unchanged file is read once.
+
+    Args:
+        env_file (str): The path to the .env file.
+        mtime (float | None): The file's modification time, None if missing.
+    """
+    load_dotenv(env_file, override=True)
 
 
 def load_config(env_file: str) -> AppConfig:
@@ -29,14 +110,15 @@ def load_config(env_file: str) -> AppConfig:
         AppConfig: The application configuration object.
     """
 
-    load_dotenv(env_file, override=True)
-
-    env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)))
-    template = env.get_template("config.yml.j2")
-
-    rendered_yaml: str = template.render(env=os.environ)
+    try:
+        mtime: float | None = os.path.getmtime(env_file)
+    except OSError:
+        mtime = None
+    load_env_file(env_file, mtime)
 
-    config_dict: dict[str, Any] = yaml.safe_load(rendered_yaml)
+    config_dict = render_config(
+        tuple((name, os.environ.get(name)) for name in get_config_env_vars())
+    )
 
     return AppConfig.model_validate(config_dict)
 
@@ -50,11 +132,82 @@ def get_app_config() -> AppConfig:
     """
     global app_config
     if app_config is None:
-        app_config = load_config(".env")
+        with app_config_lock:
+            # another thread may have loaded it while we waited on the lock
+            if app_config is None:
+                app_config = load_config(".env")
 
     return app_config
 
 
+@functools.lru_cache(maxsize=4)
+def get_openai_client(api_key: str | None, base_url: str | None) -> OpenAI:
+    """
+    Get a shared OpenAI client for the given credentials.
+
+    Args:
+        api_key (str | None): The OpenAI API key.
+        base_url (str | None): The OpenAI API base URL.
+
+    Returns:
+        OpenAI: The cached OpenAI client.
+    """
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+def image_converter_params(app_config: AppConfig) -> ConverterParams:
+    """
+    Build the converter parameters for image files.
+
+    Args:
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        ConverterParams: Parameters using an LLM client to describe the image.
+    """
+    # values come from the validated config, so skip re-validating them
+    return ConverterParams.model_construct(
+        llm_client=get_openai_client(
+            app_config.converter.openai_api_key,
+            app_config.converter.openai_api_base,
+        ),
+        llm_model=app_config.converter.openai_default_model,
+    )
+
+
+def pdf_converter_params(app_config: AppConfig) -> ConverterParams:
+    """
+    Build the converter parameters for PDF files.
+
+    Args:
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        ConverterParams: Parameters using Azure Document Intelligence.
+    """
+    return ConverterParams.model_construct(
+        docintel_endpoint=app_config.converter.azure_document_endpoint,
+    )
+
+
+# Converter options used when no extension specific builder matches
+DEFAULT_CONVERTER_OPTS: dict[str, Any] = ConverterParams(
+    enable_plugins=True
+).model_dump()
+
+# Converter parameter builders keyed on the lowercased file extension
+CONVERTER_PARAMS_BY_EXT: dict[str, Callable[[AppConfig], ConverterParams]] = {
+    ".png": image_converter_params,
+    ".jpg": image_converter_params,
+    ".jpeg": image_converter_params,
+    ".gif": image_converter_params,
+    ".bmp": image_converter_params,
+    ".tiff": image_converter_params,
+    ".pdf": pdf_converter_params,
+    ".x-pdf": pdf_converter_params,
+}
+
+
 def get_converter_opts(url: str, app_config: AppConfig) -> dict[str, Any]:
     """
     Set options for the MarkItDown converter based on the URL.
@@ -67,21 +220,54 @@ def get_converter_opts(url: str, app_config: AppConfig) -> dict[str, Any]:
         dict: The options for the converter.
     """
 
-    params = ConverterParams(enable_plugins=True)
-    if url.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff")):
-        params = ConverterParams(
-            llm_client=OpenAI(
-                api_key=app_config.converter.openai_api_key,
-                base_url=app_config.converter.openai_api_base,
-            ),
-            llm_model=app_config.converter.openai_default_model,
-        )
-    elif url.lower().endswith((".pdf", ".x-pdf")):
-        params = ConverterParams(
-            docintel_endpoint=app_config.converter.azure_document_endpoint,
+    # ignore query strings such as presigned URL signatures
+    path = url.partition("?")[0]
+    ext = os.path.splitext(path)[1].lower()
+    build_params = CONVERTER_PARAMS_BY_EXT.get(ext)
+    if build_params is None:
+        return dict(DEFAULT_CONVERTER_OPTS)
+
+    return build_params(app_config).model_dump()
+
+
+# StorageConfig attribute holding the options for each protocol; protocols
+# mapped to None need no options (local file system and HTTP(S))
+STORAGE_OPTS_BY_PROTOCOL: dict[str, str | None] = {
+    "s3": "s3",
+    "abfs": "abfs",
+    "gcs": "gcs",
+    "sftp": "sftp",
+    "smb": "smb",
+    "file": None,
+    "http": None,
+    "https": None,
+}
+
+
+def get_protocol_storage_opts(
+    protocol: str, app_config: AppConfig
+) -> dict[str, Any] | None:
+    """
+    Get the storage options for a protocol.
+
+    Args:
+        protocol (str): The URL protocol, e.g. "s3".
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        dict: The options for the protocol.
+    """
+    if protocol not in STORAGE_OPTS_BY_PROTOCOL:
+        message = (
+            f"Unsupported protocol: {protocol}, Supported: "
+            f"file, s3, abfs, gcs, sftp, smb, http"
         )
+        raise ValueError(message)
 
-    return params.model_dump()
+    attr = STORAGE_OPTS_BY_PROTOCOL[protocol]
+    if attr is None:
+        return {}
+    return getattr(app_config.storage, attr)  # type: ignore[no-any-return]
 
 
 def get_storage_opts(url: str, app_config: AppConfig) -> dict[str, Any] | None:
@@ -95,28 +281,18 @@ def get_storage_opts(url: str, app_config: AppConfig) -> dict[str, Any] | None:
     Returns:
         dict: The options for the protocol.
     """
-    protocol = url.split("://")[0]
-    if protocol == "s3":
-        return app_config.storage.s3
-    elif protocol == "abfs":
-        return app_config.storage.abfs
-    elif protocol == "gcs":
-        return app_config.storage.gcs
-    elif protocol == "sftp":
-        return app_config.storage.sftp
-    elif protocol == "smb":
-        return app_config.storage.smb
-    elif protocol in ["file", "https"]:
-        # No options needed for local file system or HTTP(S)
-        return {}
-    else:
-        message = (
-            f"Unsupported protocol: {protocol}, Supported: "
-            f"file, s3, abfs, gcs, sftp, smb, http"
-        )
-        raise ValueError(message)
+    return get_protocol_storage_opts(url.partition("://")[0], app_config)
+
 
+KEY_PATTERN = re.compile(
+    r"(context|plan|blackboard|result)"
+    r"\|([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
+    r"(?:\|([^|]+))?(?:\|([^|]+))?"
+)
+KEY_PARTS = {"context": 3, "plan": 2, "blackboard": 2, "result": 4}
 
+
+@functools.lru_cache(maxsize=4096)
 def validate_key(key: str) -> tuple[str, str, str | None, str | None]:
     """
     Validate the format of a key.
@@ -132,8 +308,13 @@ def validate_key(key: str) -> tuple[str, str, str | None, str | None]:
         ValueError: If the key is not in the correct format.
     """
 
+    # fast path for well-formed keys with a canonical UUID
+    match = KEY_PATTERN.fullmatch(key)
+    if match and key.count("|") + 1 == KEY_PARTS[match[1]]:
+        return match.groups()  # type: ignore[return-value]
+
     parts = key.split("|")
-    if parts[0] not in ("context", "plan", "blackboard", "result"):
+    if parts[0] not in KEY_PARTS:
         raise ValueError(
             "Key must start with 'result', 'context', 'plan', or 'blackboard'"
         )
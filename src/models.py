@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import Any, Literal
 
 from openai import OpenAI
@@ -34,6 +35,11 @@ class RedisConfig(BaseModel):
     ssl_certfile: str | None = None
     ssl_keyfile: str | None = None
     socket_timeout: int = 10
+    socket_keepalive: bool = True
+    health_check_interval: int = 30
+    client_name: str | None = "mcp-blackboard"
+    # entries kept by the RESP3 client-side cache, 0 disables it
+    client_cache_size: int = 0
     retry_on_timeout: bool = True
     max_connections: int = 20
     decode_responses: bool = True
@@ -46,6 +52,12 @@ class AppConfig(BaseSettings):
     storage: StorageConfig
     converter: ConverterConfig
 
+    @cached_property
+    def cache_protocol_path(self) -> tuple[str, str]:
+        """The protocol and path of ``cache_path``, split once."""
+        protocol, _, path = self.cache_path.partition("://")
+        return protocol, path
+
 
 class ConverterParams(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -57,6 +69,8 @@ class ConverterParams(BaseModel):
 
 
 class PlanStep(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int = Field(..., description="Unique identifier for the step")
     agent: Literal[
         "researcher",
@@ -79,6 +93,8 @@ class PlanStep(BaseModel):
 
 
 class Plan(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int = Field(..., description="Unique identifier for the plan")
     goal: str = Field(..., description="The main goal or objective of the plan")
     steps: list[PlanStep] = Field(..., description="List of steps in the plan")
@@ -1,23 +1,33 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from typing import Any
 
-from apscheduler.schedulers.background import (
-    BackgroundScheduler,  # type: ignore[import-untyped]
+from apscheduler.schedulers.asyncio import (
+    AsyncIOScheduler,  # type: ignore[import-untyped]
 )
 from apscheduler.triggers.cron import CronTrigger  # type: ignore[import-untyped]
 from mcp.server.fastmcp import FastMCP
 
 from common import get_app_config
 from models import Plan
-from tools.context import fetch_context, get_file_age, get_filesystem
+from tools.context import (
+    fetch_context,
+    fetch_contexts,
+    get_file_age,
+    get_filesystem,
+)
 from tools.memory import (
     fetch_blackboard,
     fetch_plan,
     fetch_result,
+    fetch_results,
     update_plan_status,
+    update_plan_statuses,
     write_context_description,
     write_plan,
     write_result,
+    write_results,
 )
 
 
@@ -35,26 +45,60 @@ def remove_stale_files(max_age: int = 3600) -> None:
     """
 
     app_config = get_app_config()
-    _, cache_path = app_config.cache_path.split("://")
+    _, cache_path = app_config.cache_protocol_path
     fs = get_filesystem(app_config.cache_path, app_config)
 
-    # remove all files older than 1 day
-    for file_info in fs.listdir(cache_path):  # type: ignore[return-value]
-        file_age = get_file_age(file_info)  # type: ignore[return-value]
-        if file_age > max_age:
-            fs.rm(f"{file_info['name']}")  # type: ignore[call-arg]
+    # collect the stale files from one listing and remove them in a single
+    # bulk call, skipping sub-directories which a non-recursive rm rejects
+    now = time.time()
+    stale_files = [
+        file_info["name"]
+        for file_info in fs.listdir(cache_path)  # type: ignore[return-value]
+        if file_info.get("type") != "directory"
+        and get_file_age(file_info, now) > max_age  # type: ignore[return-value]
+    ]
+    if stale_files:
+        fs.rm(stale_files)  # type: ignore[call-arg]
+
+
+async def remove_stale_files_job() -> None:
+    """
+    Run the cache sweep from the event loop without blocking it.
+
+    Returns:
+        None
+    """
+    await asyncio.to_thread(remove_stale_files)
 
 
-scheduler = BackgroundScheduler()
+scheduler = AsyncIOScheduler()
 trigger = CronTrigger(minute=0)  # every hour at the start of the hour
-scheduler.add_job(remove_stale_files, trigger)  # type: ignore[call-arg]
-scheduler.start()  # type: ignore[call-arg]
+# open server sessions, FastMCP enters the lifespan once per session
+scheduler_sessions = 0
 
 
 @asynccontextmanager
 async def lifespan(mcp: FastMCP):  # type: ignore[no-untyped-def]
-    yield
-    scheduler.shutdown()  # type: ignore[call-arg]
+    global scheduler_sessions
+    # one scheduler per process, started by the first session to open and
+    # stopped by the last one to close
+    if scheduler_sessions == 0:
+        # run the scheduler on the server's event loop instead of its own thread
+        scheduler.configure(event_loop=asyncio.get_running_loop())
+        scheduler.add_job(  # type: ignore[call-arg]
+            remove_stale_files_job,
+            trigger,
+            id="remove_stale_files",
+            replace_existing=True,
+        )
+        scheduler.start()  # type: ignore[call-arg]
+    scheduler_sessions += 1
+    try:
+        yield
+    finally:
+        scheduler_sessions -= 1
+        if scheduler_sessions == 0:
+            scheduler.shutdown()  # type: ignore[call-arg]
 
 
 mcp = FastMCP(
@@ -102,7 +146,7 @@ async def save_plan(plan_id: str, plan: dict[str, Any] | str) -> str:
             "Plan must be a JSON-serializable object or a valid JSON string."
         )
 
-    return write_plan(plan_id, parsed.model_dump(mode="json"))
+    return await asyncio.to_thread(write_plan, plan_id, parsed.model_dump(mode="json"))
 
 
 @mcp.tool()
@@ -117,7 +161,24 @@ async def mark_plan_as_completed(plan_id: str, step_id: int) -> str:
     Returns:
         str: A confirmation message indicating that the plan has been marked as done.
     """
-    return update_plan_status(plan_id, step_id)
+    return await asyncio.to_thread(update_plan_status, plan_id, step_id)
+
+
+@mcp.tool()
+async def mark_plan_steps_as_completed(plan_id: str, step_ids: list[int]) -> str:
+    """
+    Mark several plan steps as completed in the shared state at once
+
+    Args:
+        plan_id (str): The ID of the plan.
+        step_ids (list[int]): The IDs of the steps to mark as completed.
+
+    Returns:
+        str: A confirmation message indicating that the steps have been marked
+            as done.
+    """
+    updates = [(step_id, "completed") for step_id in step_ids]
+    return await asyncio.to_thread(update_plan_statuses, plan_id, updates)
 
 
 @mcp.tool()
@@ -144,7 +205,31 @@ async def save_result(
     Raises:
         ValueError: If the result is not in the correct format.
     """
-    return write_result(plan_id, agent_name, step_id, description, result)
+    return await asyncio.to_thread(
+        write_result, plan_id, agent_name, step_id, description, result
+    )
+
+
+@mcp.tool()
+async def save_results(
+    plan_id: str, entries: list[tuple[int, str, str, str | dict[str, Any]]]
+) -> str:
+    """
+    Save several results to the shared state at once
+
+    Args:
+        plan_id (str): The ID of the plan.
+        entries (list[tuple[int, str, str, str | dict]]): The step ID, agent name,
+            description and result of each entry. Results must be
+            JSON-serializable.
+
+    Returns:
+        str: A confirmation message indicating that the results have been saved.
+
+    Raises:
+        ValueError: If any result is not in the correct format.
+    """
+    return await asyncio.to_thread(write_results, plan_id, entries)
 
 
 @mcp.tool()
@@ -162,7 +247,9 @@ async def save_context_description(
     Returns:
         str: A confirmation message indicating that the context has been saved.
     """
-    return write_context_description(plan_id, file_path_or_url, description)
+    return await asyncio.to_thread(
+        write_context_description, plan_id, file_path_or_url, description
+    )
 
 
 @mcp.tool()
@@ -177,7 +264,7 @@ async def get_blackboard(plan_id: str) -> str | dict[str, Any] | None:
         str | dict | None: The blackboard entry associated with the ID,
             or None if not found.
     """
-    return fetch_blackboard(plan_id)
+    return await asyncio.to_thread(fetch_blackboard, plan_id)
 
 
 @mcp.tool()
@@ -191,7 +278,7 @@ async def get_plan(plan_id: str) -> str | dict[str, Any] | None:
     Returns:
         str | dict | None: The plan associated with the ID, or None if not found.
     """
-    return fetch_plan(plan_id)
+    return await asyncio.to_thread(fetch_plan, plan_id)
 
 
 @mcp.tool()
@@ -209,7 +296,23 @@ async def get_result(
     Returns:
         str | dict | None: The result associated with the ID, or None if not found.
     """
-    return fetch_result(plan_id, agent_name, step_id)
+    return await asyncio.to_thread(fetch_result, plan_id, agent_name, step_id)
+
+
+@mcp.tool()
+async def get_results(plan_id: str, steps: list[tuple[int, str]]) -> list[str | None]:
+    """
+    Fetch several results from the shared state at once
+
+    Args:
+        plan_id (str): The ID of the plan.
+        steps (list[tuple[int, str]]): The step ID and agent name of each result.
+
+    Returns:
+        list[str | None]: The results in the order requested, with None for
+            results that were not found.
+    """
+    return await asyncio.to_thread(fetch_results, plan_id, steps)
 
 
 @mcp.tool()
@@ -246,7 +349,36 @@ async def get_context(file_path_or_url: str, use_cache: bool = True) -> str:
         OSError: If there is an I/O error while loading the file.
         ValueError: If the URL is not valid or the conversion fails.
     """
-    contents: str | None = fetch_context(file_path_or_url, use_cache)
+    # fetching and converting block, so keep them off the event loop
+    contents: str | None = await asyncio.to_thread(
+        fetch_context, file_path_or_url, use_cache
+    )
     if contents is None:  # type: ignore[return-value]
         raise ValueError(f"Could not fetch context from {file_path_or_url}")
     return contents
+
+
+@mcp.tool()
+async def get_contexts(
+    file_paths_or_urls: list[str], use_cache: bool = True
+) -> list[str]:
+    """
+    Reads the contents of several media locations concurrently and converts
+    each to Markdown.
+
+    Supports the same formats and storage protocols as `get_context`.
+
+    Args:
+        file_paths_or_urls (list[str]): The file paths or URLs of the files
+            to load.
+        use_cache (bool): Whether to use the cache for loading the files.
+            Defaults to True.
+
+    Returns:
+        list[str]: The media contents in Markdown format, in the order requested.
+
+    Raises:
+        OSError: If there is an I/O error while loading a file.
+        ValueError: If a URL is not valid or a conversion fails.
+    """
+    return await fetch_contexts(file_paths_or_urls, use_cache)
@@ -1,9 +1,20 @@
+import asyncio
 import datetime
+import functools
+import gzip
 import hashlib
 import io
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, BinaryIO
 
 import fsspec  # type: ignore
 import markitdown
+from redis import Redis
+from redis.exceptions import RedisError
 from tenacity import (
     retry,
     retry_if_exception_type,
@@ -11,8 +22,49 @@ from tenacity import (
     wait_exponential,
 )
 
-from common import get_app_config, get_converter_opts, get_storage_opts
+from common import get_app_config, get_converter_opts, get_protocol_storage_opts
 from models import AppConfig
+from tools.memory import get_redis_client
+
+# read size used when streaming local files into the converter
+STREAM_BLOCK_SIZE = 8 * 1024 * 1024
+
+# object stores serve large files faster as concurrent ranged requests
+RANGED_READ_PROTOCOLS = frozenset({"s3", "gcs", "abfs"})
+RANGED_READ_THRESHOLD = 16 * 1024 * 1024
+RANGED_READ_PART_SIZE = 8 * 1024 * 1024
+
+# cache files hold gzip compressed markdown, which is mostly repetitive text
+CACHE_FILE_SUFFIX = ".md.gz"
+CACHE_COMPRESS_LEVEL = 6
+
+# documents fetched at once by fetch_contexts
+FETCH_CONCURRENCY = 8
+# fetches in flight by URL, concurrent fetches of the same URL wait for the
+# first one's result instead of converting the document again
+fetch_futures: dict[str, Future[str]] = {}
+fetch_futures_lock = threading.Lock()
+
+# in-process cache of converted documents in front of the cache files, entries
+# expire with the same one hour lifetime the cache sweep applies to the files;
+# it holds at most CONTEXT_CACHE_SIZE documents and CONTEXT_CACHE_MAX_CHARS
+# characters of markdown
+CONTEXT_CACHE_SIZE = 256
+CONTEXT_CACHE_MAX_CHARS = 128 * 1024 * 1024
+CONTEXT_CACHE_TTL = 3600
+context_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+context_cache_chars = 0
+context_cache_lock = threading.Lock()
+
+# converted documents are also kept in Redis, ahead of a possibly remote
+# cache path, for the same one hour
+REDIS_CACHE_PREFIX = "ctx"
+# larger documents are left to the cache path, Redis also holds the plans
+REDIS_CACHE_MAX_CHARS = 1024 * 1024
+# after Redis fails the cache path is used alone for this many seconds, so a
+# down server costs one timeout per cooldown instead of one per lookup
+REDIS_CACHE_COOLDOWN = 60
+redis_cache_retry_at = 0.0
 
 
 def get_filesystem(url: str, app_config: AppConfig) -> fsspec.AbstractFileSystem:
@@ -26,22 +78,32 @@ def get_filesystem(url: str, app_config: AppConfig) -> fsspec.AbstractFileSystem
     Returns:
         fsspec.AbstractFileSystem: The filesystem object.
     """
-    protocol, _ = url.split("://")
-    storage_options = get_storage_opts(url, app_config)
+    # fsspec caches instances on (protocol, options), so repeated calls for
+    # the same protocol reuse the filesystem and its credentials
+    protocol = url.partition("://")[0]
+    storage_options = get_protocol_storage_opts(protocol, app_config)
     fs = fsspec.filesystem(protocol, **storage_options)  # type: ignore[call-arg]
     return fs  # type: ignore[return-value]
 
 
-def get_file_age(file_info: dict[str, str | int | float]) -> int:
+def get_file_age(
+    file_info: dict[str, str | int | float], now: float | None = None
+) -> int:
     """
     Get the age of a file.
 
     Args:
         file_info (dict): The file information dictionary.
+        now (float | None): The current POSIX timestamp. Pass it in when
+            checking many files to sample the clock once. Defaults to None,
+            which uses the current time.
 
     Returns:
-        datetime.timedelta: The age of the file.
+        int: The age of the file in seconds.
     """
+    if now is None:
+        now = time.time()
+
     if ctime := file_info.get("ctime"):
         if isinstance(ctime, str):
             try:
@@ -49,18 +111,16 @@ def get_file_age(file_info: dict[str, str | int | float]) -> int:
             except ValueError:
                 # If ctime is a string that cannot be converted to float, return 0
                 return 0
-
-        created_at = datetime.datetime.fromtimestamp(ctime, tz=datetime.UTC)
     else:
-        created_at = file_info.get("creation_time")  # type: ignore[assignment]
-        if created_at and not getattr(created_at, "tzinfo", None):
-            created_at = created_at.replace(tzinfo=datetime.UTC)  # type: ignore[assignment]
+        created_at = file_info.get("creation_time")
+        if not getattr(created_at, "tzinfo", None):
+            created_at = created_at.replace(tzinfo=datetime.UTC)  # type: ignore[union-attr]
+        ctime = created_at.timestamp()  # type: ignore[union-attr]
 
-    current_time = datetime.datetime.now(datetime.UTC)
-    delta = current_time - created_at  # type: ignore[assignment]
-    return int(delta.total_seconds())  # type: ignore[return-value]
+    return int(now - ctime)
 
 
+@functools.lru_cache(maxsize=4096)
 def get_cache_key(url: str) -> str:
     """
     Generate a cache key based on the URL.
@@ -71,7 +131,189 @@ def get_cache_key(url: str) -> str:
     Returns:
         str: The generated cache key.
     """
-    return hashlib.md5(url.encode()).hexdigest()
+    # 16 byte BLAKE2b keeps the 32 character names of the old MD5 keys
+    return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+
+def get_content_key(source: BinaryIO, converter_options: dict[str, Any]) -> str:
+    """
+    Generate a cache key from the contents of a file and its converter options.
+
+    The same bytes convert differently under different options, e.g. a PDF
+    through Document Intelligence, so the options are part of the key. The
+    stream is rewound afterwards so it can be read again.
+
+    Args:
+        source (BinaryIO): The seekable file contents.
+        converter_options (dict): The options the file is converted with.
+
+    Returns:
+        str: The generated cache key.
+    """
+    digest = hashlib.file_digest(source, lambda: hashlib.blake2b(digest_size=16))
+    source.seek(0)
+    for name, value in sorted(converter_options.items()):
+        # clients are keyed on their type, their settings are not comparable
+        if not isinstance(value, str | int | float | None):
+            value = type(value).__name__
+        digest.update(f"{name}={value!r};".encode())
+    return digest.hexdigest()
+
+
+def get_redis_cache_client(app_config: AppConfig) -> Redis | None:
+    """
+    Get the Redis client for cached contents, unless Redis recently failed.
+
+    Args:
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        Redis | None: The Redis client, or None while Redis is skipped.
+    """
+    if time.monotonic() < redis_cache_retry_at:
+        return None
+    try:
+        return get_redis_client(app_config)
+    except Exception:
+        # the cache path works without Redis, so any failure to build the
+        # client, credential errors included, only disables this layer
+        skip_redis_cache()
+        return None
+
+
+def skip_redis_cache() -> None:
+    """
+    Skip Redis for cached contents until the cooldown has passed.
+
+    Returns:
+        None
+    """
+    global redis_cache_retry_at
+    redis_cache_retry_at = time.monotonic() + REDIS_CACHE_COOLDOWN
+
+
+def get_redis_cache_entry(key: str, app_config: AppConfig) -> str | None:
+    """
+    Get the cached contents for a key from Redis.
+
+    Args:
+        key (str): The cache key.
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        str | None: The cached contents, or None if missing or Redis is
+            unavailable.
+    """
+    if (client := get_redis_cache_client(app_config)) is None:
+        return None
+    try:
+        contents = client.get(f"{REDIS_CACHE_PREFIX}|{key}")
+    except RedisError:
+        skip_redis_cache()
+        return None
+    if isinstance(contents, bytes):
+        return contents.decode("utf-8")
+    return contents  # type: ignore[return-value]
+
+
+def set_redis_cache_entry(key: str, contents: str, app_config: AppConfig) -> None:
+    """
+    Store the contents for a key in Redis, ignoring Redis being unavailable.
+
+    Contents over REDIS_CACHE_MAX_CHARS are not stored.
+
+    Args:
+        key (str): The cache key.
+        contents (str): The contents to cache.
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        None
+    """
+    if len(contents) > REDIS_CACHE_MAX_CHARS:
+        return
+    if (client := get_redis_cache_client(app_config)) is None:
+        return
+    try:
+        client.setex(f"{REDIS_CACHE_PREFIX}|{key}", CONTEXT_CACHE_TTL, contents)
+    except RedisError:
+        skip_redis_cache()
+
+
+def write_cache_entry(
+    key: str, contents: str, app_config: AppConfig, use_redis: bool = True
+) -> None:
+    """
+    Write the contents to the cache file for a key.
+
+    Args:
+        key (str): The cache key.
+        contents (str): The contents to write to the cache file.
+        app_config (dict): The application configuration.
+        use_redis (bool): Whether to also keep the contents in Redis.
+            Defaults to True.
+
+    Returns:
+        None
+    """
+    if use_redis:
+        set_redis_cache_entry(key, contents, app_config)
+
+    _, cache_path = app_config.cache_protocol_path
+    fs = get_filesystem(app_config.cache_path, app_config)
+    cache_file = f"{cache_path}/{key}{CACHE_FILE_SUFFIX}"
+    data = gzip.compress(contents.encode("utf-8"), CACHE_COMPRESS_LEVEL, mtime=0)
+    # only create the cache directory when a write finds it missing, object
+    # stores have no directories and never fail here
+    try:
+        fs.pipe_file(cache_file, data)  # type: ignore[call-arg]
+    except FileNotFoundError:
+        fs.mkdir(cache_path, create_parents=True, exist_ok=True)  # type: ignore[call-arg]
+        fs.pipe_file(cache_file, data)  # type: ignore[call-arg]
+
+
+def load_cache_entry(key: str, app_config: AppConfig, use_redis: bool = True) -> str:
+    """
+    Load the contents of the cache file for a key.
+
+    Args:
+        key (str): The cache key.
+        app_config (dict): The application configuration.
+        use_redis (bool): Whether to look in Redis first and keep the contents
+            there once loaded. Defaults to True.
+
+    Returns:
+        str: The contents of the cache file.
+    """
+    if use_redis and (contents := get_redis_cache_entry(key, app_config)):
+        return contents
+
+    _, cache_path = app_config.cache_protocol_path
+    fs = get_filesystem(app_config.cache_path, app_config)
+
+    cache_file = f"{cache_path}/{key}{CACHE_FILE_SUFFIX}"
+    # a single read, a missing file surfaces as an error instead of a lookup
+    try:
+        data = fs.cat_file(cache_file)  # type: ignore[call-arg]
+    except FileNotFoundError:
+        raise OSError(f"Cache file {cache_file} does not exist") from None
+    except IsADirectoryError:
+        raise OSError(f"Cache file {cache_file} is not a file") from None
+
+    if not data:
+        raise ValueError(f"Cache file {cache_file} is empty")
+    try:
+        contents: str = gzip.decompress(data).decode("utf-8")
+    except (OSError, EOFError, zlib.error):
+        raise ValueError(f"Cache file {cache_file} is not compressed") from None
+    except UnicodeDecodeError:
+        raise ValueError(f"Cache file {cache_file} is not a string") from None
+    if not contents:
+        raise ValueError(f"Cache file {cache_file} is empty")
+
+    if use_redis:
+        set_redis_cache_entry(key, contents, app_config)
+    return contents
 
 
 def write_cache_file(url: str, contents: str, app_config: AppConfig) -> None:
@@ -86,13 +328,7 @@ def write_cache_file(url: str, contents: str, app_config: AppConfig) -> None:
     Returns:
         None
     """
-    hash_key = get_cache_key(url)
-    _, cache_path = app_config.cache_path.split("://")
-    fs = get_filesystem(app_config.cache_path, app_config)
-    fs.mkdir(cache_path, create_parents=True, exist_ok=True)  # type: ignore[call-arg]
-    cache_file = f"{cache_path}/{hash_key}.md"
-    with fs.open(cache_file, "w") as f:  # type: ignore[call-arg]
-        f.write(contents)  # type: ignore[call-arg]
+    write_cache_entry(get_cache_key(url), contents, app_config)
 
 
 def load_cache_file(url: str, app_config: AppConfig) -> str:
@@ -106,24 +342,99 @@ def load_cache_file(url: str, app_config: AppConfig) -> str:
     Returns:
         str: The contents of the cache file.
     """
-    hash_key = get_cache_key(url)
-    _, cache_path = app_config.cache_path.split("://")
-    fs = get_filesystem(app_config.cache_path, app_config)
+    return load_cache_entry(get_cache_key(url), app_config)
+
+
+def read_remote_file(fs: fsspec.AbstractFileSystem, url: str) -> bytes:
+    """
+    Read the whole contents of a remote file.
+
+    Large files on object stores are fetched as concurrent ranged requests,
+    other files with a single request.
+
+    Args:
+        fs (fsspec.AbstractFileSystem): The filesystem holding the file.
+        url (str): The URL of the file.
+
+    Returns:
+        bytes: The contents of the file.
+    """
+    protocol = url.partition("://")[0]
+    if protocol in RANGED_READ_PROTOCOLS:
+        size = fs.size(url)  # type: ignore[call-arg]
+        if size and size > RANGED_READ_THRESHOLD:
+            starts = list(range(0, size, RANGED_READ_PART_SIZE))
+            ends = [min(start + RANGED_READ_PART_SIZE, size) for start in starts]
+            parts = fs.cat_ranges([url] * len(starts), starts, ends)  # type: ignore[call-arg]
+            return b"".join(parts)
+
+    return fs.cat_file(url)  # type: ignore[call-arg,no-any-return]
+
+
+@functools.lru_cache(maxsize=8)
+def get_converter(options: tuple[tuple[str, Any], ...]) -> markitdown.MarkItDown:
+    """
+    Get a shared MarkItDown converter for a set of options.
+
+    Args:
+        options (tuple[tuple[str, Any], ...]): The sorted converter options.
 
-    cache_file = f"{cache_path}/{hash_key}.md"
-    if not fs.exists(cache_file):  # type: ignore[call-arg]
-        raise OSError(f"Cache file {cache_file} does not exist")
+    Returns:
+        markitdown.MarkItDown: The cached converter.
+    """
+    return markitdown.MarkItDown(**dict(options))
+
+
+def get_cached_context(url: str) -> str | None:
+    """
+    Get converted contents from the in-process cache.
+
+    Args:
+        url (str): The URL of the file.
+
+    Returns:
+        str | None: The cached contents, or None if missing or expired.
+    """
+    global context_cache_chars
+    with context_cache_lock:
+        entry = context_cache.get(url)
+        if entry is None:
+            return None
+        expires_at, contents = entry
+        if expires_at <= time.monotonic():
+            del context_cache[url]
+            context_cache_chars -= len(contents)
+            return None
+        context_cache.move_to_end(url)
+        return contents
+
+
+def put_cached_context(url: str, contents: str) -> None:
+    """
+    Add converted contents to the in-process cache.
 
-    if not fs.isfile(cache_file):  # type: ignore[call-arg]
-        raise OSError(f"Cache file {cache_file} is not a file")
+    Args:
+        url (str): The URL of the file.
+        contents (str): The converted contents.
 
-    with fs.open(cache_file, "r") as f:  # type: ignore[call-arg]
-        content = f.read()
-        if not content:
-            raise ValueError(f"Cache file {cache_file} is empty")
-        if not isinstance(content, str):
-            raise ValueError(f"Cache file {cache_file} is not a string")
-        return content
+    Returns:
+        None
+    """
+    global context_cache_chars
+    # a single document larger than the whole budget is not worth caching
+    if len(contents) > CONTEXT_CACHE_MAX_CHARS:
+        return
+    with context_cache_lock:
+        if (previous := context_cache.pop(url, None)) is not None:
+            context_cache_chars -= len(previous[1])
+        context_cache[url] = (time.monotonic() + CONTEXT_CACHE_TTL, contents)
+        context_cache_chars += len(contents)
+        while (
+            len(context_cache) > CONTEXT_CACHE_SIZE
+            or context_cache_chars > CONTEXT_CACHE_MAX_CHARS
+        ):
+            _, (_, evicted) = context_cache.popitem(last=False)
+            context_cache_chars -= len(evicted)
 
 
 @retry(
@@ -150,29 +461,96 @@ def fetch_context(file_path_or_url: str, use_cache: bool = True) -> str:
     """
 
     app_config = get_app_config()
+
+    if not use_cache:
+        return load_context(file_path_or_url, use_cache, app_config)
+    # if the document was converted recently, use it
+    if (contents := get_cached_context(file_path_or_url)) is not None:
+        return contents
+
+    # one thread loads or converts a document while concurrent fetches of the
+    # same URL wait for its result, fetches of other URLs are not held up
+    with fetch_futures_lock:
+        future = fetch_futures.get(file_path_or_url)
+        if leader := future is None:
+            future = fetch_futures[file_path_or_url] = Future()
+    if not leader:
+        return future.result()
+
+    try:
+        contents = load_context(file_path_or_url, use_cache, app_config)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(contents)
+        return contents
+    finally:
+        with fetch_futures_lock:
+            del fetch_futures[file_path_or_url]
+
+
+def load_context(file_path_or_url: str, use_cache: bool, app_config: AppConfig) -> str:
+    """
+    Load a file from the caches or convert it, without deduplicating fetches.
+
+    Args:
+        file_path_or_url (str): The file path or URL of the file to load.
+        use_cache (bool): Whether to use the cache for loading the file.
+        app_config (AppConfig): The application configuration.
+
+    Returns:
+        str: The converted Markdown content.
+
+    Raises:
+        OSError: If there is an I/O error while loading the file.
+        ValueError: If the URL is not valid or the conversion fails.
+    """
     converter_options = get_converter_opts(file_path_or_url, app_config)
 
-    # if a cache file exists, load it
     if use_cache:
+        # a fetch that just finished may have converted it already
+        if (contents := get_cached_context(file_path_or_url)) is not None:
+            return contents
         try:
-            return load_cache_file(file_path_or_url, app_config)
+            contents = load_cache_file(file_path_or_url, app_config)
         except OSError:
             pass
+        else:
+            put_cached_context(file_path_or_url, contents)
+            return contents
 
     try:
-        fs = get_filesystem(file_path_or_url, app_config)  # type: ignore[call-arg]
-        with fs.open(file_path_or_url, "rb") as f:  # type: ignore[call-arg]
-            buffer = io.BytesIO(f.read())  # type: ignore[call-arg]
+        protocol, _, path = file_path_or_url.partition("://")
+        if protocol == "file":
+            # stream local files so large documents are not held in memory, the
+            # converter needs a buffered reader which fsspec files are not
+            source: BinaryIO = open(path, "rb", buffering=STREAM_BLOCK_SIZE)
+        else:
+            fs = get_filesystem(file_path_or_url, app_config)  # type: ignore[call-arg]
+            source = io.BytesIO(read_remote_file(fs, file_path_or_url))
     except Exception as e:
         raise OSError(f"Failed to load file from {file_path_or_url}: {e}") from None
 
-    client = markitdown.MarkItDown(**converter_options)
-    document = client.convert(buffer)
-
-    # save a copy of the file to the cache for future use
-    if use_cache:
-        write_cache_file(file_path_or_url, document.markdown, app_config)
-
+    with source:
+        # other URLs may already have served the same bytes, e.g. rotated
+        # presigned links, so look the contents up before converting them
+        if use_cache:
+            content_key = get_content_key(source, converter_options)
+            try:
+                contents = load_cache_entry(content_key, app_config, use_redis=False)
+            except OSError:
+                pass
+            else:
+                write_cache_file(file_path_or_url, contents, app_config)
+                put_cached_context(file_path_or_url, contents)
+                return contents
+
+        client = get_converter(tuple(sorted(converter_options.items())))
+        document = client.convert(source)
+
+    # check the output before caching it, so a failed conversion is not
+    # served from the cache on the next fetch
     if not document.markdown:
         raise ValueError(f"Failed to convert file {file_path_or_url} to Markdown")
 
@@ -181,4 +559,42 @@ def fetch_context(file_path_or_url: str, use_cache: bool = True) -> str:
             f"Converted content is not a string: {type(document.markdown)}"
         )
 
+    # save a copy of the file to the cache for future use
+    if use_cache:
+        write_cache_file(file_path_or_url, document.markdown, app_config)
+        # the URL entry above is the copy kept in Redis, the content entry
+        # only needs to outlive rotated links on the cache path
+        write_cache_entry(content_key, document.markdown, app_config, use_redis=False)
+        put_cached_context(file_path_or_url, document.markdown)
+
     return document.markdown
+
+
+async def fetch_contexts(
+    file_paths_or_urls: list[str],
+    use_cache: bool = True,
+    max_concurrency: int = FETCH_CONCURRENCY,
+) -> list[str]:
+    """
+    Load several files concurrently and convert their contents to markdown.
+
+    Args:
+        file_paths_or_urls (list[str]): The file paths or URLs of the files.
+        use_cache (bool): Whether to use the cache for loading the files.
+            Defaults to True.
+        max_concurrency (int): The most files fetched at once. Defaults to 8.
+
+    Returns:
+        list[str]: The converted Markdown content, in the order requested.
+
+    Raises:
+        OSError: If there is an I/O error while loading a file.
+        ValueError: If a URL is not valid or a conversion fails.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_one(file_path_or_url: str) -> str:
+        async with semaphore:
+            return await asyncio.to_thread(fetch_context, file_path_or_url, use_cache)
+
+    return await asyncio.gather(*(fetch_one(url) for url in file_paths_or_urls))
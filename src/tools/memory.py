@@ -1,13 +1,141 @@
-import json
-from typing import Any
+import socket
+import threading
+import time
+from typing import TYPE_CHECKING, Any
 
-from azure.identity import DefaultAzureCredential
-from redis import Redis
+from pydantic_core import from_json, to_json
+from redis import BlockingConnectionPool, Connection, Redis, SSLConnection
+from redis.cache import CacheConfig
+from redis.client import Pipeline
+from redis.credentials import CredentialProvider
 
 from common import get_app_config
 from models import AppConfig
 
+if TYPE_CHECKING:
+    from azure.core.credentials import AccessToken
+    from azure.identity import DefaultAzureCredential
+
 redis_client: None | Redis = None
+redis_client_lock = threading.Lock()
+azure_credential: "None | DefaultAzureCredential" = None
+
+AZURE_REDIS_SCOPE = "https://redis.azure.com/.default"
+# refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+# connections opened when the Redis client is created
+REDIS_WARM_CONNECTIONS = 4
+# probe idle connections after 60s, every 30s, and drop them after 3 misses so
+# NAT and load balancer timeouts are detected before the next command
+REDIS_KEEPALIVE_OPTIONS = {
+    option: value
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 30), ("TCP_KEEPCNT", 3))
+    if (option := getattr(socket, name, None)) is not None
+}
+
+
+def get_azure_credential() -> "DefaultAzureCredential":
+    """
+    Get the shared Azure credential used to authenticate with Azure Redis.
+
+    Returns:
+        DefaultAzureCredential: The cached Azure credential.
+    """
+
+    global azure_credential
+    if azure_credential is None:
+        # azure.identity is slow to import and only needed for Azure Redis
+        from azure.identity import DefaultAzureCredential
+
+        azure_credential = DefaultAzureCredential(
+            exclude_interactive_browser_credential=True,
+            exclude_visual_studio_code_credential=True,
+        )
+    return azure_credential
+
+
+class AzureRedisCredentialProvider(CredentialProvider):
+    """
+    Supply Microsoft Entra tokens to Redis, refreshing them before they expire.
+    """
+
+    def __init__(self, username: str | None = None):
+        self.username = username
+        self.token: AccessToken | None = None
+        self.lock = threading.Lock()
+
+    def get_token(self) -> str:
+        """
+        Get a valid access token for Azure Redis.
+
+        Returns:
+            str: The access token.
+        """
+        with self.lock:
+            if (
+                self.token is None
+                or self.token.expires_on - TOKEN_REFRESH_MARGIN <= time.time()
+            ):
+                self.token = get_azure_credential().get_token(AZURE_REDIS_SCOPE)
+            return self.token.token
+
+    def get_credentials(self) -> tuple[str] | tuple[str, str]:
+        """
+        Get the credentials used when a Redis connection authenticates.
+
+        Returns:
+            tuple[str] | tuple[str, str]: The token, prefixed by the username
+                when one is configured.
+        """
+        token = self.get_token()
+        if self.username:
+            return self.username, token
+        return (token,)
+
+
+def make_redis_pool(
+    app_config: AppConfig, credential_provider: CredentialProvider | None = None
+) -> BlockingConnectionPool:
+    """
+    Build a blocking connection pool from the Redis configuration.
+
+    Callers wait up to the socket timeout for a free connection once
+    max_connections are in use, instead of failing straight away.
+
+    Args:
+        app_config (AppConfig): The application configuration.
+        credential_provider (CredentialProvider | None): Supplies credentials
+            in place of the configured username and password.
+
+    Returns:
+        BlockingConnectionPool: The connection pool.
+    """
+
+    options = app_config.redis.model_dump()
+    max_connections = options.pop("max_connections")
+    if options.pop("ssl"):
+        connection_class: type[Connection] = SSLConnection
+    else:
+        connection_class = Connection
+        options = {k: v for k, v in options.items() if not k.startswith("ssl_")}
+    if options["socket_keepalive"]:
+        options["socket_keepalive_options"] = REDIS_KEEPALIVE_OPTIONS
+    if cache_size := options.pop("client_cache_size"):
+        # server-assisted client-side caching needs RESP3, reads of unchanged
+        # keys are then served locally until Redis invalidates them
+        options["protocol"] = 3
+        options["cache_config"] = CacheConfig(max_size=cache_size)
+    if credential_provider is not None:
+        options.pop("username")
+        options.pop("password")
+        options["credential_provider"] = credential_provider
+
+    return BlockingConnectionPool(
+        connection_class=connection_class,
+        max_connections=max_connections,
+        timeout=app_config.redis.socket_timeout,
+        **options,
+    )
 
 
 def get_redis_client(app_config: AppConfig) -> Redis:
@@ -20,14 +148,72 @@ def get_redis_client(app_config: AppConfig) -> Redis:
 
     global redis_client
     if redis_client is None:
-        if "windows.net" in app_config.redis.host:
-            cred = DefaultAzureCredential()
-            token = cred.get_token("https://redis.azure.com/.default")
-            app_config.redis.password = token.token
-        redis_client = Redis(**app_config.redis.model_dump())
+        with redis_client_lock:
+            # another thread may have created it while we waited on the lock
+            if redis_client is None:
+                provider = None
+                if "windows.net" in app_config.redis.host:
+                    # each new connection re-authenticates with a fresh token
+                    provider = AzureRedisCredentialProvider(app_config.redis.username)
+                client = Redis(connection_pool=make_redis_pool(app_config, provider))
+                warm_up_redis_pool(
+                    client,
+                    min(REDIS_WARM_CONNECTIONS, app_config.redis.max_connections),
+                )
+                redis_client = client
     return redis_client
 
 
+def warm_up_redis_pool(client: Redis, size: int) -> None:
+    """
+    Open and authenticate pooled connections ahead of the first tool call.
+
+    Args:
+        client (Redis): The Redis client whose pool to warm up.
+        size (int): The number of connections to open.
+    """
+
+    pool = client.connection_pool
+    connections = []
+    try:
+        for _ in range(size):
+            connection = pool.get_connection("PING")
+            connections.append(connection)
+            connection.send_command("PING")
+            connection.read_response()
+    finally:
+        for connection in connections:
+            pool.release(connection)
+
+
+def dump_json_value(value: dict[str, Any] | str, label: str) -> str:
+    """
+    Get the JSON text to store for a dict or a JSON string.
+
+    A string is stored as given once it parses, so fetches can return it
+    verbatim, and only a dict is encoded.
+
+    Args:
+        value (dict|str): The value to store.
+        label (str): What the value is, used in the error message.
+
+    Returns:
+        str: The JSON text of the value.
+
+    Raises:
+        ValueError: If the value is neither a dict nor a valid JSON string.
+    """
+    if isinstance(value, str):
+        try:
+            from_json(value)
+        except ValueError:
+            raise ValueError(f"{label} must be a JSON-serializable object") from None
+        return value
+    if isinstance(value, dict):
+        return to_json(value).decode()
+    raise ValueError(f"{label} must be a JSON-serializable object")
+
+
 def write_plan(plan_id: str, plan: dict[str, Any] | str) -> str:
     """
     Write a plan to the shared state
@@ -42,18 +228,10 @@ def write_plan(plan_id: str, plan: dict[str, Any] | str) -> str:
     Raises:
         ValueError: If the plan is not in the correct format.
     """
-    if not isinstance(plan, dict | str):  # type: ignore
-        raise ValueError("Plan must be a JSON-serializable object")
-
-    if isinstance(plan, str):
-        try:
-            plan = json.loads(plan)
-        except json.JSONDecodeError:
-            raise ValueError("Plan must be a JSON-serializable object") from None
-
+    data = dump_json_value(plan, "Plan")
     client = get_redis_client(get_app_config())
-    client.json().set(plan_id, "$", plan)  # type: ignore
-    client.expire(plan_id, 3600)
+    # plain SET with the expiry, the RedisJSON module is not needed
+    client.set(plan_id, data, ex=3600)
     return "ok"
 
 
@@ -68,10 +246,44 @@ def update_plan_status(plan_id: str, step_id: int, status: str = "completed") ->
 
     Returns:
         str: A confirmation message.
+
+    Raises:
+        ValueError: If the plan or the step does not exist.
+    """
+    return update_plan_statuses(plan_id, [(step_id, status)])
+
+
+def update_plan_statuses(plan_id: str, updates: list[tuple[int, str]]) -> str:
+    """
+    Set the status of several plan steps in the shared state at once
+
+    Args:
+        plan_id (str): The ID of the plan.
+        updates (list[tuple[int, str]]): The step ID and new status of each step.
+
+    Returns:
+        str: A confirmation message.
+
+    Raises:
+        ValueError: If the plan or any of the steps does not exist.
     """
     client = get_redis_client(get_app_config())
-    path = f".steps.[{step_id - 1}].status"
-    client.json().set(plan_id, path, status)  # type: ignore
+
+    def set_step_statuses(pipe: Pipeline) -> None:
+        raw = pipe.get(plan_id)
+        if raw is None:
+            raise ValueError(f"Plan {plan_id} not found")
+        plan = from_json(raw)
+        for step_id, status in updates:
+            if not 0 < step_id <= len(plan["steps"]):
+                raise ValueError(f"Step {step_id} not found in plan {plan_id}")
+            plan["steps"][step_id - 1]["status"] = status
+        pipe.multi()
+        pipe.set(plan_id, to_json(plan), keepttl=True)
+
+    # rewrite the plan only if no other write landed since it was read, all
+    # updates go out in the one write
+    client.transaction(set_step_statuses, plan_id)
     return "ok"
 
 
@@ -93,8 +305,11 @@ def write_context_description(
 
     _b_key = f"blackboard|{plan_id}".lower()
     _v_key = f"context|{plan_id}|{file_path_or_url}"
-    client.hset(_b_key, _v_key, description)  # type: ignore
-    client.expire(_b_key, 3600)
+    # MULTI/EXEC in the same round trip, the hash never outlives its expiry
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(_b_key, _v_key, description)  # type: ignore
+    pipe.expire(_b_key, 3600)
+    pipe.execute()
     return "ok"
 
 
@@ -122,23 +337,50 @@ def write_result(
         ValueError: If the result is not in the correct format.
     """
 
-    if not isinstance(result, dict | str):  # type: ignore
-        raise ValueError("Result must be a JSON-serializable object")
+    return write_results(plan_id, [(step_id, agent_name, description, result)])
+
+
+def write_results(
+    plan_id: str, entries: list[tuple[int, str, str, dict[str, Any] | str]]
+) -> str:
+    """
+    Save several results to the shared state in one round trip
+
+    Args:
+        plan_id (str): The ID of the plan.
+        entries (list[tuple[int, str, str, dict | str]]): The step ID, agent name,
+            description and result of each entry. Results should be
+            JSON-serializable objects.
+
+    Returns:
+        str: A confirmation message.
+
+    Raises:
+        ValueError: If any result is not in the correct format.
+    """
+
+    # check every result before anything is written
+    descriptions: dict[str, str] = {}
+    values: dict[str, str] = {}
+    for step_id, agent_name, description, result in entries:
+        data = dump_json_value(result, "Result")
+        _v_key = f"result|{plan_id}|{step_id}|{agent_name}".lower()
+        descriptions[_v_key] = description
+        values[_v_key] = data
+
+    if not entries:
+        return "ok"
 
-    if isinstance(result, str):
-        try:
-            data = json.loads(result)
-        except json.JSONDecodeError:
-            raise ValueError("Result must be a JSON-serializable object") from None
-    else:
-        data = json.dumps(result)
     client = get_redis_client(get_app_config())
     _b_key = f"blackboard|{plan_id}".lower()
-    _v_key = f"result|{plan_id}|{step_id}|{agent_name}".lower()
-    client.hset(_b_key, _v_key, description)  # type: ignore
-    client.expire(_b_key, 3600)
-    client.set(_v_key, data)
-    client.expire(_v_key, 3600)
+    # one variadic HSET for the descriptions and a SET per result, all sent in
+    # a single round trip as one MULTI/EXEC so no key is left without its expiry
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(_b_key, mapping=descriptions)  # type: ignore
+    pipe.expire(_b_key, 3600)
+    for _v_key, data in values.items():
+        pipe.set(_v_key, data, ex=3600)
+    pipe.execute()
     return "ok"
 
 
@@ -153,7 +395,10 @@ def fetch_plan(plan_id: str) -> str | dict[str, Any] | None:
         str | dict | None: The plan associated with the ID, or None if not found.
     """
     client = get_redis_client(get_app_config())
-    return client.json().get(plan_id)  # type: ignore
+    raw = client.get(plan_id)
+    if raw is None:
+        return None
+    return from_json(raw)  # type: ignore[no-any-return]
 
 
 def fetch_blackboard(plan_id: str) -> str | dict[str, Any] | None:
@@ -168,7 +413,7 @@ def fetch_blackboard(plan_id: str) -> str | dict[str, Any] | None:
     """
     client = get_redis_client(get_app_config())
     _b_key = f"blackboard|{plan_id}".lower()
-    return json.dumps(client.hgetall(_b_key))  # type: ignore
+    return to_json(client.hgetall(_b_key)).decode()  # type: ignore
 
 
 def fetch_result(
@@ -188,4 +433,28 @@ def fetch_result(
     """
     client = get_redis_client(get_app_config())
     _v_key = f"result|{plan_id}|{step_id}|{agent_name}".lower()
-    return json.dumps(client.get(_v_key))
+    # results are stored as JSON text already
+    return client.get(_v_key)  # type: ignore[return-value]
+
+
+def fetch_results(plan_id: str, steps: list[tuple[int, str]]) -> list[str | None]:
+    """
+    Fetch several results from the shared state in one round trip
+
+    Args:
+        plan_id (str): The ID of the plan.
+        steps (list[tuple[int, str]]): The step ID and agent name of each result.
+
+    Returns:
+        list[str | None]: The stored JSON of each result in the order requested,
+        or None for results that were not found.
+    """
+    if not steps:
+        return []
+
+    client = get_redis_client(get_app_config())
+    keys = [
+        f"result|{plan_id}|{step_id}|{agent_name}".lower()
+        for step_id, agent_name in steps
+    ]
+    return client.mget(keys)  # type: ignore[return-value]
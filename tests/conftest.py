@@ -2,15 +2,26 @@
 import os
 import tempfile
 from collections.abc import Generator
+from types import SimpleNamespace
 from typing import Any
 from unittest.mock import MagicMock, patch
 
+import fsspec
 import pytest
+from pytest_asyncio import is_async_test
 from redis import Redis
 
 from models import AppConfig, ConverterConfig, RedisConfig, StorageConfig
 
 
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    """Run every async test on the one session-scoped event loop."""
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+
 @pytest.fixture
 def mock_redis() -> Generator[MagicMock]:
     """Mock Redis client for testing."""
@@ -130,6 +141,68 @@ def mock_filesystem():
         yield mock_fs_instance
 
 
+@pytest.fixture
+def fake_mcp(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Stand-in for the FastMCP server used by main."""
+    mcp = SimpleNamespace(run=MagicMock())
+    monkeypatch.setattr("main.mcp", mcp)
+    return mcp
+
+
+@pytest.fixture
+def fake_config(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Stand-in for the application configuration loaded by main."""
+    config = SimpleNamespace(mcp_transport="stdio")
+    monkeypatch.setattr("main.get_app_config", lambda: config)
+    return config
+
+
+@pytest.fixture
+def memfs():
+    """In-memory fsspec filesystem standing in for the cache path."""
+    fs = fsspec.filesystem("memory")
+    with patch("tools.context.get_filesystem", return_value=fs):
+        yield fs
+    fs.store.clear()
+    fs.pseudo_dirs[:] = [""]
+
+
+@pytest.fixture
+def redis_client() -> Generator[MagicMock]:
+    """Mock the Redis client used as the first layer of the context cache."""
+    with patch("tools.context.get_redis_client") as mock_get_redis_client:
+        mock_get_redis_client.return_value.get.return_value = None
+        yield mock_get_redis_client.return_value
+
+
+@pytest.fixture
+def mock_cache_fs(mock_app_config: AppConfig) -> Generator[MagicMock]:
+    """Mock filesystem swept by the server's stale file job."""
+    fs = MagicMock()
+    with (
+        patch("server.get_app_config", return_value=mock_app_config),
+        patch("server.get_filesystem", return_value=fs),
+    ):
+        yield fs
+
+
+@pytest.fixture
+def mock_file_age() -> Generator[MagicMock]:
+    """Mock the age the server reads from each cache listing entry."""
+    with patch("server.get_file_age") as mock_get_file_age:
+        yield mock_get_file_age
+
+
+@pytest.fixture
+def idle_scheduler() -> Generator[Any]:
+    """The server's scheduler with start and shutdown stubbed out."""
+    from server import scheduler
+
+    with patch.object(scheduler, "start"), patch.object(scheduler, "shutdown"):
+        yield scheduler
+    scheduler.remove_all_jobs()
+
+
 @pytest.fixture
 def mock_markitdown():
     """Mock MarkItDown converter."""
@@ -156,14 +229,41 @@ def reset_global_state():
     """Reset global state before each test."""
     # Import here to avoid circular imports
     import common as common
+    import server as server
+    import tools.context as context
     import tools.memory as memory
 
     # Reset global variables
+    server.scheduler_sessions = 0
     common.app_config = None
+    common.get_openai_client.cache_clear()
+    common.get_config_template.cache_clear()
+    common.get_config_env_vars.cache_clear()
+    common.load_env_file.cache_clear()
+    common.render_config.cache_clear()
+    common.validate_key.cache_clear()
     memory.redis_client = None
+    memory.azure_credential = None
+    context.context_cache.clear()
+    context.context_cache_chars = 0
+    context.get_converter.cache_clear()
+    context.redis_cache_retry_at = 0.0
+    context.fetch_futures.clear()
 
     yield
 
     # Clean up after test
     common.app_config = None
+    common.get_openai_client.cache_clear()
+    common.get_config_template.cache_clear()
+    common.get_config_env_vars.cache_clear()
+    common.load_env_file.cache_clear()
+    common.render_config.cache_clear()
+    common.validate_key.cache_clear()
     memory.redis_client = None
+    memory.azure_credential = None
+    context.context_cache.clear()
+    context.context_cache_chars = 0
+    context.get_converter.cache_clear()
+    context.redis_cache_retry_at = 0.0
+    context.fetch_futures.clear()
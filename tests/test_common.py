@@ -1,6 +1,8 @@
 # type: ignore
 import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -8,7 +10,9 @@ import yaml
 
 from common import (
     get_app_config,
+    get_config_env_vars,
     get_converter_opts,
+    get_openai_client,
     get_storage_opts,
     load_config,
     validate_key,
@@ -23,10 +27,11 @@ class TestLoadConfig:
         """Test successful config loading."""
         with (
             patch("common.load_dotenv"),
-            patch("common.Path"),
+            patch("common.get_config_env_vars", return_value=("REDIS_HOST",)),
             patch("common.Environment") as mock_env,
-            patch("common.yaml.safe_load") as mock_yaml_load,
+            patch("common.yaml.load") as mock_yaml_load,
             patch("common.AppConfig.model_validate") as mock_validate,
+            patch.dict(os.environ, {"REDIS_HOST": "localhost"}),
         ):
             mock_template = MagicMock()
             mock_template.render.return_value = "test_yaml_content"
@@ -40,7 +45,9 @@ class TestLoadConfig:
             result = load_config(temp_env_file)
 
             assert result == mock_app_config
-            mock_template.render.assert_called_once_with(env=os.environ)
+            mock_template.render.assert_called_once_with(
+                env={"REDIS_HOST": "localhost"}
+            )
 
     def test_load_config_file_not_found(self):
         """Test config loading with missing file."""
@@ -56,7 +63,7 @@ class TestLoadConfig:
             patch("common.load_dotenv"),
             patch("common.Path"),
             patch("common.Environment") as mock_env,
-            patch("common.yaml.safe_load") as mock_yaml_load,
+            patch("common.yaml.load") as mock_yaml_load,
         ):
             mock_template = MagicMock()
             mock_template.render.return_value = "invalid: yaml: content:"
@@ -69,6 +76,76 @@ class TestLoadConfig:
             with pytest.raises(yaml.YAMLError):
                 load_config(temp_env_file)
 
+    def test_load_config_reuses_template(self, temp_env_file: str):
+        """Test the config template is compiled once across loads."""
+        with (
+            patch("common.load_dotenv"),
+            patch("common.Environment") as mock_env,
+            patch("common.yaml.load"),
+            patch("common.AppConfig.model_validate"),
+        ):
+            load_config(temp_env_file)
+            load_config(temp_env_file)
+
+            mock_env.assert_called_once()
+            mock_env.return_value.get_template.assert_called_once_with("config.yml.j2")
+
+    def test_load_config_skips_render_for_unchanged_env(self, temp_env_file: str):
+        """Test an unchanged environment reuses the parsed config."""
+        with (
+            patch("common.load_dotenv"),
+            patch("common.get_config_env_vars", return_value=("REDIS_HOST",)),
+            patch("common.Environment") as mock_env,
+            patch("common.yaml.load") as mock_yaml_load,
+            patch("common.AppConfig.model_validate"),
+            patch.dict(os.environ, {"REDIS_HOST": "localhost"}),
+        ):
+            mock_template = mock_env.return_value.get_template.return_value
+            mock_yaml_load.return_value = {"test": "config"}
+
+            load_config(temp_env_file)
+            load_config(temp_env_file)
+
+            mock_template.render.assert_called_once()
+            mock_yaml_load.assert_called_once()
+
+            # variables the template does not use do not trigger a render
+            os.environ["UNRELATED_VAR"] = "value"
+            load_config(temp_env_file)
+
+            mock_template.render.assert_called_once()
+
+            os.environ["REDIS_HOST"] = "other-host"
+            load_config(temp_env_file)
+
+            assert mock_template.render.call_count == 2
+
+    def test_load_config_reads_env_file_once(self, temp_env_file: str):
+        """Test an unchanged .env file is only loaded once."""
+        with (
+            patch("common.load_dotenv") as mock_load_dotenv,
+            patch("common.render_config"),
+            patch("common.AppConfig.model_validate"),
+        ):
+            load_config(temp_env_file)
+            load_config(temp_env_file)
+
+            mock_load_dotenv.assert_called_once_with(temp_env_file, override=True)
+
+            mtime = os.path.getmtime(temp_env_file)
+            os.utime(temp_env_file, (mtime + 10, mtime + 10))
+            load_config(temp_env_file)
+
+            assert mock_load_dotenv.call_count == 2
+
+    def test_get_config_env_vars(self):
+        """Test the template variables are discovered from the template."""
+        names = get_config_env_vars()
+
+        assert "CACHE_PATH" in names
+        assert "REDIS_HOST" in names
+        assert list(names) == sorted(names)
+
 
 class TestGetAppConfig:
     """Test the get_app_config function."""
@@ -99,6 +176,22 @@ class TestGetAppConfig:
             # load_config should only be called once
             assert mock_load_config.call_count == 1
 
+    def test_get_app_config_concurrent_calls(self, mock_app_config: AppConfig):
+        """Test concurrent first calls load the config only once."""
+
+        def slow_load_config(env_file: str) -> AppConfig:
+            time.sleep(0.01)
+            return mock_app_config
+
+        with patch("common.load_config") as mock_load_config:
+            mock_load_config.side_effect = slow_load_config
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda _: get_app_config(), range(8)))
+
+            assert all(result is mock_app_config for result in results)
+            assert mock_load_config.call_count == 1
+
 
 class TestGetConverterOpts:
     """Test the get_converter_opts function."""
@@ -126,7 +219,7 @@ class TestGetConverterOpts:
             "llm_model": "gpt-4o",
             "docintel_endpoint": None,
         }
-        mock_converter_params.return_value = mock_params_instance
+        mock_converter_params.model_construct.return_value = mock_params_instance
 
         result = get_converter_opts(url, mock_app_config)
 
@@ -141,6 +234,14 @@ class TestGetConverterOpts:
             base_url=mock_app_config.converter.openai_api_base,
         )
 
+    def test_get_converter_opts_reuses_openai_client(self, mock_app_config: AppConfig):
+        """Test the OpenAI client is shared across image URLs."""
+        result1 = get_converter_opts("https://example.com/a.png", mock_app_config)
+        result2 = get_converter_opts("https://example.com/b.jpg", mock_app_config)
+
+        assert result1["llm_client"] is result2["llm_client"]
+        assert get_openai_client.cache_info().misses == 1
+
     def test_get_converter_opts_pdf_url(self, mock_app_config: AppConfig):
         """Test converter options for PDF URLs."""
         url = "https://example.com/document.pdf"
@@ -155,6 +256,29 @@ class TestGetConverterOpts:
             == mock_app_config.converter.azure_document_endpoint
         )
 
+    def test_get_converter_opts_uppercase_extension(self, mock_app_config: AppConfig):
+        """Test converter options match extensions case-insensitively."""
+        url = "https://example.com/Document.X-PDF"
+
+        result = get_converter_opts(url, mock_app_config)
+
+        assert result["enable_plugins"] is False
+        assert (
+            result["docintel_endpoint"]
+            == mock_app_config.converter.azure_document_endpoint
+        )
+
+    def test_get_converter_opts_presigned_url(self, mock_app_config: AppConfig):
+        """Test converter options ignore the query string of presigned URLs."""
+        url = "https://bucket.s3.amazonaws.com/report.pdf?X-Amz-Signature=abc.def"
+
+        result = get_converter_opts(url, mock_app_config)
+
+        assert (
+            result["docintel_endpoint"]
+            == mock_app_config.converter.azure_document_endpoint
+        )
+
     def test_get_converter_opts_other_url(self, mock_app_config: AppConfig):
         """Test converter options for other file types."""
         url = "https://example.com/document.txt"
@@ -166,6 +290,15 @@ class TestGetConverterOpts:
         assert result["llm_model"] == "gpt-4o"
         assert result["docintel_endpoint"] is None
 
+    def test_get_converter_opts_default_is_copy(self, mock_app_config: AppConfig):
+        """Test the default options cannot be mutated by callers."""
+        result = get_converter_opts("https://example.com/a.txt", mock_app_config)
+        result["enable_plugins"] = False
+
+        result = get_converter_opts("https://example.com/b.txt", mock_app_config)
+
+        assert result["enable_plugins"] is True
+
 
 class TestGetStorageOpts:
     """Test the get_storage_opts function."""
@@ -226,6 +359,14 @@ class TestGetStorageOpts:
 
         assert result == {}
 
+    def test_get_storage_opts_http(self, mock_app_config: AppConfig):
+        """Test storage options for plain HTTP URLs."""
+        url = "http://example.com/file.txt"
+
+        result = get_storage_opts(url, mock_app_config)
+
+        assert result == {}
+
     def test_get_storage_opts_unsupported_protocol(self, mock_app_config: AppConfig):
         """Test storage options for unsupported protocols."""
         url = "ftp://server/file.txt"
@@ -233,6 +374,13 @@ class TestGetStorageOpts:
         with pytest.raises(ValueError, match="Unsupported protocol: ftp"):
             get_storage_opts(url, mock_app_config)
 
+    def test_get_storage_opts_missing_protocol(self, mock_app_config: AppConfig):
+        """Test storage options for URLs without a protocol."""
+        url = "/tmp/file.txt"
+
+        with pytest.raises(ValueError, match="Unsupported protocol: /tmp/file.txt"):
+            get_storage_opts(url, mock_app_config)
+
 
 class TestValidateKey:
     """Test the validate_key function."""
@@ -316,3 +464,41 @@ class TestValidateKey:
 
         with pytest.raises(ValueError, match="Plan ID must be a valid UUID"):
             validate_key(key)
+
+    def test_validate_key_uppercase_uuid(self):
+        """Test validating a key with an uppercase UUID."""
+        plan_id = str(uuid.uuid4()).upper()
+        key = f"blackboard|{plan_id}"
+
+        result = validate_key(key)
+
+        assert result == ("blackboard", plan_id, None, None)
+
+    def test_validate_key_non_canonical_uuid(self):
+        """Test validating a key with a UUID missing hyphens."""
+        plan_id = uuid.uuid4().hex
+        key = f"plan|{plan_id}"
+
+        result = validate_key(key)
+
+        assert result == ("plan", plan_id, None, None)
+
+    def test_validate_key_plan_with_result_arity(self):
+        """Test a plan key with extra parts is rejected on the fast path."""
+        plan_id = str(uuid.uuid4())
+        key = f"plan|{plan_id}|1|agent"
+
+        with pytest.raises(
+            ValueError, match="Plan or blackboard must be in the format"
+        ):
+            validate_key(key)
+
+    def test_validate_key_cached(self):
+        """Test repeated validation of the same key is served from the cache."""
+        key = f"plan|{uuid.uuid4()}"
+
+        result1 = validate_key(key)
+        result2 = validate_key(key)
+
+        assert result1 is result2
+        assert validate_key.cache_info().hits == 1
@@ -1,17 +1,33 @@
 # type: ignore
 import datetime
+import gzip
 import io
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 from unittest.mock import MagicMock, patch
 
 import pytest
+from azure.core.exceptions import ClientAuthenticationError
+from redis.exceptions import ConnectionError as RedisConnectionError
 
+import tools.context
+from common import get_converter_opts
 from tools.context import (
+    CONTEXT_CACHE_TTL,
+    context_cache,
     fetch_context,
+    fetch_contexts,
     get_cache_key,
+    get_cached_context,
+    get_content_key,
+    get_converter,
     get_file_age,
     get_filesystem,
     load_cache_file,
+    put_cached_context,
+    read_remote_file,
     write_cache_file,
 )
 
@@ -20,7 +36,7 @@ class TestGetFilesystem:
     """Test the get_filesystem function."""
 
     @patch("tools.context.fsspec.filesystem")
-    @patch("tools.context.get_storage_opts")
+    @patch("tools.context.get_protocol_storage_opts")
     def test_get_filesystem_s3(
         self,
         mock_get_storage_opts: MagicMock,
@@ -37,11 +53,11 @@ class TestGetFilesystem:
         result = get_filesystem(url, mock_app_config)
 
         assert result == mock_fs
-        mock_get_storage_opts.assert_called_once_with(url, mock_app_config)
+        mock_get_storage_opts.assert_called_once_with("s3", mock_app_config)
         mock_filesystem.assert_called_once_with("s3", **storage_opts)
 
     @patch("tools.context.fsspec.filesystem")
-    @patch("tools.context.get_storage_opts")
+    @patch("tools.context.get_protocol_storage_opts")
     def test_get_filesystem_local(
         self,
         mock_get_storage_opts: MagicMock,
@@ -58,9 +74,20 @@ class TestGetFilesystem:
         result = get_filesystem(url, mock_app_config)
 
         assert result == mock_fs
-        mock_get_storage_opts.assert_called_once_with(url, mock_app_config)
+        mock_get_storage_opts.assert_called_once_with("file", mock_app_config)
         mock_filesystem.assert_called_once_with("file", **storage_opts)
 
+    @patch("tools.context.fsspec.filesystem")
+    def test_get_filesystem_nested_url(
+        self, mock_filesystem: MagicMock, mock_app_config
+    ):
+        """Test a URL containing another URL resolves the outer protocol."""
+        url = "https://example.com/redirect?to=https://other.com/file.txt"
+
+        get_filesystem(url, mock_app_config)
+
+        mock_filesystem.assert_called_once_with("https")
+
 
 class TestGetFileAge:
     """Test the get_file_age function."""
@@ -129,6 +156,14 @@ class TestGetFileAge:
         # timezone offset differences. Allow for reasonable range.
         assert age > 0  # Just ensure it's positive and not zero
 
+    def test_get_file_age_with_explicit_now(self):
+        """Test getting file age against a supplied current time."""
+        file_info = {"ctime": 1_000.0}
+
+        age = get_file_age(file_info, now=4_600.5)
+
+        assert age == 3600
+
 
 class TestGetCacheKey:
     """Test the get_cache_key function."""
@@ -139,7 +174,7 @@ class TestGetCacheKey:
 
         key = get_cache_key(url)
 
-        # Should be a 32-character hex string (MD5 hash)
+        # Should be a 32-character hex string (16 byte BLAKE2b hash)
         assert len(key) == 32
         assert all(c in "0123456789abcdef" for c in key)
 
@@ -162,104 +197,275 @@ class TestGetCacheKey:
 
         assert key1 != key2
 
+    def test_get_content_key(self):
+        """Test content keys depend on the bytes and rewind the stream."""
+        source = io.BytesIO(b"test content")
+
+        key = get_content_key(source, {})
 
+        assert key == get_content_key(io.BytesIO(b"test content"), {})
+        assert key != get_content_key(io.BytesIO(b"other content"), {})
+        assert source.tell() == 0
+
+    def test_get_content_key_converter_options(self, mock_app_config):
+        """Test the same bytes converted with other options get another key."""
+        pdf_options = get_converter_opts("s3://bucket/report.pdf", mock_app_config)
+        txt_options = get_converter_opts("s3://bucket/report.txt", mock_app_config)
+
+        pdf_key = get_content_key(io.BytesIO(b"%PDF-1.7"), pdf_options)
+        txt_key = get_content_key(io.BytesIO(b"%PDF-1.7"), txt_options)
+
+        assert pdf_key != txt_key
+        assert pdf_key == get_content_key(io.BytesIO(b"%PDF-1.7"), dict(pdf_options))
+
+
+@pytest.mark.usefixtures("redis_client")
 class TestWriteCacheFile:
     """Test the write_cache_file function."""
 
-    @patch("tools.context.get_filesystem")
-    @patch("tools.context.get_cache_key")
     def test_write_cache_file(
         self,
-        mock_get_cache_key: MagicMock,
-        mock_get_filesystem: MagicMock,
+        memfs,
         mock_app_config,
+        redis_client: MagicMock,
     ):
         """Test writing cache file."""
         url = "https://example.com/file.txt"
         contents = "# Test Content"
-        hash_key = "testhash123"
+        hash_key = get_cache_key(url)
 
-        mock_get_cache_key.return_value = hash_key
+        write_cache_file(url, contents, mock_app_config)
+
+        data = memfs.cat_file(f"/tmp/test_cache/{hash_key}.md.gz")
+        assert gzip.decompress(data).decode() == contents
+        redis_client.setex.assert_called_once_with(
+            f"ctx|{hash_key}", CONTEXT_CACHE_TTL, contents
+        )
+
+    def test_write_then_load_cache_file(self, memfs, mock_app_config):
+        """Test a written cache file loads back unchanged."""
+        url = "https://example.com/file.txt"
+
+        write_cache_file(url, "# Résumé", mock_app_config)
+
+        assert load_cache_file(url, mock_app_config) == "# Résumé"
+
+    @patch("tools.context.REDIS_CACHE_MAX_CHARS", 4)
+    def test_write_cache_file_large_contents(
+        self,
+        memfs,
+        mock_app_config,
+        redis_client: MagicMock,
+    ):
+        """Test contents over the Redis size cap only go to the cache path."""
+        url = "https://example.com/file.txt"
+
+        write_cache_file(url, "# Test Content", mock_app_config)
+
+        redis_client.setex.assert_not_called()
+        assert memfs.exists(f"/tmp/test_cache/{get_cache_key(url)}.md.gz")
+
+    @patch("tools.context.get_filesystem")
+    def test_write_cache_file_creates_directory(
+        self,
+        mock_get_filesystem: MagicMock,
+        mock_app_config,
+    ):
+        """Test the cache directory is created when a write finds it missing."""
         mock_fs = MagicMock()
+        mock_fs.pipe_file.side_effect = [FileNotFoundError("missing"), None]
         mock_get_filesystem.return_value = mock_fs
 
-        mock_app_config.cache_path = "file:///tmp/cache"
-
-        write_cache_file(url, contents, mock_app_config)
+        write_cache_file("https://example.com/file.txt", "# Content", mock_app_config)
 
-        mock_get_cache_key.assert_called_once_with(url)
-        mock_get_filesystem.assert_called_once_with(
-            mock_app_config.cache_path, mock_app_config
-        )
         mock_fs.mkdir.assert_called_once_with(
-            "/tmp/cache", create_parents=True, exist_ok=True
+            "/tmp/test_cache", create_parents=True, exist_ok=True
         )
-        mock_fs.open.assert_called_once_with("/tmp/cache/testhash123.md", "w")
-
-        # Check that write was called on the file handle
-        mock_file = mock_fs.open.return_value.__enter__.return_value
-        mock_file.write.assert_called_once_with(contents)
+        assert mock_fs.pipe_file.call_count == 2
 
 
+@pytest.mark.usefixtures("redis_client")
 class TestLoadCacheFile:
     """Test the load_cache_file function."""
 
+    def test_load_cache_file_success(self, memfs, mock_app_config):
+        """Test loading cache file successfully."""
+        url = "https://example.com/file.txt"
+        cached_content = "# Cached Content"
+        memfs.pipe_file(
+            f"/tmp/test_cache/{get_cache_key(url)}.md.gz",
+            gzip.compress(cached_content.encode()),
+        )
+
+        result = load_cache_file(url, mock_app_config)
+
+        assert result == cached_content
+
+    def test_load_cache_file_not_found(self, memfs, mock_app_config):
+        """Test loading non-existent cache file."""
+        url = "https://example.com/file.txt"
+
+        with pytest.raises(OSError, match="Cache file .* does not exist"):
+            load_cache_file(url, mock_app_config)
+
     @patch("tools.context.get_filesystem")
     @patch("tools.context.get_cache_key")
-    def test_load_cache_file_success(
+    def test_load_cache_file_empty(
         self,
         mock_get_cache_key: MagicMock,
         mock_get_filesystem: MagicMock,
         mock_app_config,
     ):
-        """Test loading cache file successfully."""
+        """Test loading an empty cache file."""
+        mock_get_cache_key.return_value = "testhash123"
+        mock_fs = MagicMock()
+        mock_get_filesystem.return_value = mock_fs
+        mock_fs.cat_file.return_value = b""
+
+        with pytest.raises(ValueError, match="Cache file .* is empty"):
+            load_cache_file("https://example.com/file.txt", mock_app_config)
+
+    def test_load_cache_file_empty_contents(self, memfs, mock_app_config):
+        """Test a cache file holding compressed empty markdown is rejected."""
         url = "https://example.com/file.txt"
-        hash_key = "testhash123"
-        cached_content = "# Cached Content"
+        memfs.pipe_file(
+            f"/tmp/test_cache/{get_cache_key(url)}.md.gz", gzip.compress(b"")
+        )
+
+        with pytest.raises(ValueError, match="Cache file .* is empty"):
+            load_cache_file(url, mock_app_config)
 
-        mock_get_cache_key.return_value = hash_key
+    @patch("tools.context.get_filesystem")
+    def test_load_cache_file_not_compressed(
+        self,
+        mock_get_filesystem: MagicMock,
+        mock_app_config,
+    ):
+        """Test loading a cache file that is not gzip compressed."""
         mock_fs = MagicMock()
         mock_get_filesystem.return_value = mock_fs
-        mock_fs.exists.return_value = True
+        mock_fs.cat_file.return_value = b"# Plain Content"
 
-        # Mock file reading
-        mock_file = MagicMock()
-        mock_file.read.return_value = cached_content
-        mock_fs.open.return_value.__enter__.return_value = mock_file
+        with pytest.raises(ValueError, match="Cache file .* is not compressed"):
+            load_cache_file("https://example.com/file.txt", mock_app_config)
 
-        mock_app_config.cache_path = "file:///tmp/cache"
+    @patch("tools.context.get_filesystem")
+    def test_load_cache_file_from_redis(
+        self,
+        mock_get_filesystem: MagicMock,
+        mock_app_config,
+        redis_client: MagicMock,
+    ):
+        """Test contents cached in Redis skip the cache path."""
+        url = "https://example.com/file.txt"
+        redis_client.get.return_value = "# Cached Content"
 
         result = load_cache_file(url, mock_app_config)
 
-        assert result == cached_content
-        mock_get_cache_key.assert_called_once_with(url)
-        mock_get_filesystem.assert_called_once_with(
-            mock_app_config.cache_path, mock_app_config
-        )
-        mock_fs.exists.assert_called_once_with("/tmp/cache/testhash123.md")
-        mock_fs.open.assert_called_once_with("/tmp/cache/testhash123.md", "r")
+        assert result == "# Cached Content"
+        redis_client.get.assert_called_once_with(f"ctx|{get_cache_key(url)}")
+        mock_get_filesystem.assert_not_called()
 
     @patch("tools.context.get_filesystem")
-    @patch("tools.context.get_cache_key")
-    def test_load_cache_file_not_found(
+    def test_load_cache_file_redis_unavailable(
         self,
-        mock_get_cache_key: MagicMock,
         mock_get_filesystem: MagicMock,
         mock_app_config,
+        redis_client: MagicMock,
     ):
-        """Test loading non-existent cache file."""
-        url = "https://example.com/file.txt"
-        hash_key = "testhash123"
+        """Test Redis errors fall through to the cache path."""
+        redis_client.get.side_effect = RedisConnectionError("down")
+        redis_client.setex.side_effect = RedisConnectionError("down")
+        mock_fs = MagicMock()
+        mock_fs.cat_file.return_value = gzip.compress(b"# Cached Content")
+        mock_get_filesystem.return_value = mock_fs
+
+        result = load_cache_file("https://example.com/file.txt", mock_app_config)
 
-        mock_get_cache_key.return_value = hash_key
+        assert result == "# Cached Content"
+
+    @patch("tools.context.get_filesystem")
+    def test_load_cache_file_skips_redis_after_failure(
+        self,
+        mock_get_filesystem: MagicMock,
+        mock_app_config,
+        redis_client: MagicMock,
+    ):
+        """Test Redis is not tried again until the cooldown has passed."""
+        redis_client.get.side_effect = RedisConnectionError("down")
         mock_fs = MagicMock()
+        mock_fs.cat_file.return_value = gzip.compress(b"# Cached Content")
         mock_get_filesystem.return_value = mock_fs
-        mock_fs.exists.return_value = False
 
-        mock_app_config.cache_path = "file:///tmp/cache"
+        load_cache_file("https://example.com/file.txt", mock_app_config)
+        load_cache_file("https://example.com/file.txt", mock_app_config)
 
-        with pytest.raises(OSError, match="Cache file .* does not exist"):
-            load_cache_file(url, mock_app_config)
+        redis_client.get.assert_called_once()
+        redis_client.setex.assert_not_called()
+
+
+class TestReadRemoteFile:
+    """Test the read_remote_file function."""
+
+    def test_read_remote_file_http(self):
+        """Test HTTP files are read with a single request."""
+        mock_fs = MagicMock()
+        mock_fs.cat_file.return_value = b"data"
+
+        result = read_remote_file(mock_fs, "https://example.com/file.pdf")
+
+        assert result == b"data"
+        mock_fs.size.assert_not_called()
+        mock_fs.cat_ranges.assert_not_called()
+
+    def test_read_remote_file_small_object(self):
+        """Test small objects are read with a single request."""
+        mock_fs = MagicMock()
+        mock_fs.size.return_value = 1024
+        mock_fs.cat_file.return_value = b"data"
+
+        result = read_remote_file(mock_fs, "s3://bucket/file.pdf")
+
+        assert result == b"data"
+        mock_fs.cat_ranges.assert_not_called()
+
+    @patch("tools.context.RANGED_READ_THRESHOLD", 8)
+    @patch("tools.context.RANGED_READ_PART_SIZE", 4)
+    def test_read_remote_file_large_object(self):
+        """Test large objects are read as ranged requests."""
+        url = "s3://bucket/file.pdf"
+        mock_fs = MagicMock()
+        mock_fs.size.return_value = 10
+        mock_fs.cat_ranges.return_value = [b"abcd", b"efgh", b"ij"]
+
+        result = read_remote_file(mock_fs, url)
+
+        assert result == b"abcdefghij"
+        mock_fs.cat_ranges.assert_called_once_with([url] * 3, [0, 4, 8], [4, 8, 10])
+        mock_fs.cat_file.assert_not_called()
+
+
+class TestGetConverter:
+    """Test the get_converter function."""
+
+    @patch("tools.context.markitdown.MarkItDown")
+    def test_get_converter_reused(self, mock_markitdown: MagicMock):
+        """Test converters are shared between calls with the same options."""
+        options = (("enable_plugins", True), ("llm_client", None))
+
+        converter1 = get_converter(options)
+        converter2 = get_converter(options)
+
+        assert converter1 is converter2
+        mock_markitdown.assert_called_once_with(enable_plugins=True, llm_client=None)
+
+    @patch("tools.context.markitdown.MarkItDown")
+    def test_get_converter_different_options(self, mock_markitdown: MagicMock):
+        """Test different options build different converters."""
+        get_converter((("enable_plugins", True),))
+        get_converter((("enable_plugins", False),))
+
+        assert mock_markitdown.call_count == 2
 
 
 class TestFetchContext:
@@ -287,6 +493,51 @@ class TestFetchContext:
         assert result == cached_content
         mock_load_cache.assert_called_once_with(url, mock_get_app_config.return_value)
 
+    @patch("tools.context.get_redis_client")
+    @patch("tools.context.get_app_config")
+    def test_fetch_context_redis_client_error(
+        self,
+        mock_get_app_config: MagicMock,
+        mock_get_redis_client: MagicMock,
+        memfs,
+        mock_app_config,
+    ):
+        """Test a failure to build the Redis client falls back to the cache path."""
+        url = "https://example.com/file.txt"
+        memfs.pipe_file(
+            f"/tmp/test_cache/{get_cache_key(url)}.md.gz",
+            gzip.compress(b"# Cached Content"),
+        )
+        mock_get_app_config.return_value = mock_app_config
+        mock_get_redis_client.side_effect = ClientAuthenticationError("no token")
+
+        result = fetch_context(url, use_cache=True)
+
+        assert result == "# Cached Content"
+        mock_get_redis_client.assert_called_once()
+
+    @patch("tools.context.load_cache_file")
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    def test_fetch_context_from_memory(
+        self,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        mock_load_cache: MagicMock,
+    ):
+        """Test repeat fetches are served from the in-process cache."""
+        url = "https://example.com/file.txt"
+        mock_load_cache.return_value = "# Cached Content"
+        mock_get_converter_opts.return_value = {}
+
+        result1 = fetch_context(url, use_cache=True)
+        result2 = fetch_context(url, use_cache=True)
+
+        assert result1 == result2 == "# Cached Content"
+        mock_load_cache.assert_called_once()
+
+    @patch("tools.context.write_cache_entry")
+    @patch("tools.context.load_cache_entry")
     @patch("tools.context.write_cache_file")
     @patch("tools.context.load_cache_file")
     @patch("tools.context.get_filesystem")
@@ -301,6 +552,8 @@ class TestFetchContext:
         mock_get_filesystem: MagicMock,
         mock_load_cache: MagicMock,
         mock_write_cache: MagicMock,
+        mock_load_entry: MagicMock,
+        mock_write_entry: MagicMock,
     ):
         """Test fetching context when cache miss occurs."""
         url = "https://example.com/file.txt"
@@ -309,12 +562,11 @@ class TestFetchContext:
 
         # Mock cache miss
         mock_load_cache.side_effect = OSError("Cache miss")
+        mock_load_entry.side_effect = OSError("Cache miss")
 
         # Mock filesystem
         mock_fs = MagicMock()
-        mock_file = MagicMock()
-        mock_file.read.return_value = file_content
-        mock_fs.open.return_value.__enter__.return_value = mock_file
+        mock_fs.cat_file.return_value = file_content
         mock_get_filesystem.return_value = mock_fs
 
         # Mock converter
@@ -332,9 +584,97 @@ class TestFetchContext:
 
         assert result == markdown_content
         mock_get_filesystem.assert_called_once_with(url, mock_app_config)
-        mock_fs.open.assert_called_once_with(url, "rb")
+        mock_fs.cat_file.assert_called_once_with(url)
         mock_markitdown.assert_called_once_with()
         mock_write_cache.assert_called_once_with(url, markdown_content, mock_app_config)
+        content_key = get_content_key(io.BytesIO(file_content), {})
+        mock_load_entry.assert_called_once_with(
+            content_key, mock_app_config, use_redis=False
+        )
+        mock_write_entry.assert_called_once_with(
+            content_key, markdown_content, mock_app_config, use_redis=False
+        )
+
+    @patch("tools.context.get_app_config")
+    def test_fetch_context_single_redis_copy(
+        self,
+        mock_get_app_config: MagicMock,
+        memfs,
+        redis_client: MagicMock,
+        mock_markitdown: MagicMock,
+        mock_app_config,
+    ):
+        """Test a conversion is kept in Redis once, under its URL key."""
+        url = "memory://docs/report.txt"
+        memfs.pipe_file("/docs/report.txt", b"report")
+        mock_get_app_config.return_value = mock_app_config
+
+        fetch_context(url, use_cache=True)
+
+        redis_client.setex.assert_called_once_with(
+            f"ctx|{get_cache_key(url)}", CONTEXT_CACHE_TTL, "# Test Markdown Content"
+        )
+        assert len(memfs.glob("/tmp/test_cache/*.md.gz")) == 2
+
+    @patch("tools.context.get_app_config")
+    def test_fetch_context_empty_conversion_not_cached(
+        self,
+        mock_get_app_config: MagicMock,
+        memfs,
+        redis_client: MagicMock,
+        mock_markitdown: MagicMock,
+        mock_app_config,
+    ):
+        """Test an empty conversion fails again instead of being served cached."""
+        url = "memory://docs/empty.txt"
+        memfs.pipe_file("/docs/empty.txt", b"nothing to convert")
+        mock_get_app_config.return_value = mock_app_config
+        mock_markitdown.convert.return_value.markdown = ""
+
+        for _ in range(2):
+            context_cache.clear()
+            with pytest.raises(ValueError, match="Failed to convert"):
+                fetch_context(url, use_cache=True)
+
+        assert mock_markitdown.convert.call_count == 2
+        assert not memfs.glob("/tmp/test_cache/*.md.gz")
+        redis_client.setex.assert_not_called()
+
+    @patch("tools.context.load_cache_entry")
+    @patch("tools.context.write_cache_file")
+    @patch("tools.context.load_cache_file")
+    @patch("tools.context.get_filesystem")
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    @patch("tools.context.markitdown.MarkItDown")
+    def test_fetch_context_same_content(
+        self,
+        mock_markitdown: MagicMock,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        mock_get_filesystem: MagicMock,
+        mock_load_cache: MagicMock,
+        mock_write_cache: MagicMock,
+        mock_load_entry: MagicMock,
+    ):
+        """Test contents already converted under another URL are not converted."""
+        url = "https://example.com/file.txt?sig=rotated"
+        markdown_content = "# Test Content"
+
+        mock_load_cache.side_effect = OSError("Cache miss")
+        mock_load_entry.return_value = markdown_content
+        mock_fs = MagicMock()
+        mock_fs.cat_file.return_value = b"test content"
+        mock_get_filesystem.return_value = mock_fs
+        mock_app_config = MagicMock()
+        mock_get_app_config.return_value = mock_app_config
+        mock_get_converter_opts.return_value = {}
+
+        result = fetch_context(url, use_cache=True)
+
+        assert result == markdown_content
+        mock_markitdown.assert_not_called()
+        mock_write_cache.assert_called_once_with(url, markdown_content, mock_app_config)
 
     @patch("tools.context.write_cache_file")
     @patch("tools.context.get_filesystem")
@@ -356,9 +696,7 @@ class TestFetchContext:
 
         # Mock filesystem
         mock_fs = MagicMock()
-        mock_file = MagicMock()
-        mock_file.read.return_value = file_content
-        mock_fs.open.return_value.__enter__.return_value = mock_file
+        mock_fs.cat_file.return_value = file_content
         mock_get_filesystem.return_value = mock_fs
 
         # Mock converter
@@ -376,7 +714,7 @@ class TestFetchContext:
 
         assert result == markdown_content
         mock_get_filesystem.assert_called_once_with(url, mock_app_config)
-        mock_fs.open.assert_called_once_with(url, "rb")
+        mock_fs.cat_file.assert_called_once_with(url)
         mock_markitdown.assert_called_once_with()
         # Cache should not be written when use_cache=False
         mock_write_cache.assert_not_called()
@@ -395,7 +733,7 @@ class TestFetchContext:
 
         # Mock filesystem error
         mock_fs = MagicMock()
-        mock_fs.open.side_effect = FileNotFoundError("File not found")
+        mock_fs.cat_file.side_effect = FileNotFoundError("File not found")
         mock_get_filesystem.return_value = mock_fs
 
         mock_app_config = MagicMock()
@@ -426,9 +764,7 @@ class TestFetchContext:
 
         # Mock filesystem
         mock_fs = MagicMock()
-        mock_file = MagicMock()
-        mock_file.read.return_value = file_content
-        mock_fs.open.return_value.__enter__.return_value = mock_file
+        mock_fs.cat_file.return_value = file_content
         mock_get_filesystem.return_value = mock_fs
 
         # Mock converter
@@ -452,3 +788,238 @@ class TestFetchContext:
         args, kwargs = mock_client.convert.call_args
         assert len(args) == 1
         assert isinstance(args[0], io.BytesIO)
+
+    @patch("tools.context.get_filesystem")
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    @patch("tools.context.markitdown.MarkItDown")
+    def test_fetch_context_streams_local_file(
+        self,
+        mock_markitdown: MagicMock,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        mock_get_filesystem: MagicMock,
+        tmp_path,
+    ):
+        """Test local files are streamed into the converter."""
+        path = tmp_path / "large.csv"
+        path.write_text("a,b\n1,2\n")
+        url = f"file://{path}"
+
+        mock_client = mock_markitdown.return_value
+        mock_client.convert.return_value.markdown = "# Large"
+        mock_get_converter_opts.return_value = {}
+
+        result = fetch_context(url, use_cache=False)
+
+        assert result == "# Large"
+        mock_get_filesystem.assert_not_called()
+        (source,), _ = mock_client.convert.call_args
+        assert isinstance(source, io.BufferedReader)
+        assert source.name == str(path)
+        assert source.closed
+
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    def test_fetch_context_missing_local_file(
+        self,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        tmp_path,
+    ):
+        """Test a missing local file is reported as a load failure."""
+        mock_get_converter_opts.return_value = {}
+
+        with pytest.raises(OSError, match="Failed to load file from"):
+            # call the undecorated function to skip the retry back-off
+            fetch_context.__wrapped__(f"file://{tmp_path}/missing.pdf", use_cache=False)
+
+
+class TestFetchContextConcurrency:
+    """Test concurrent fetch_context calls."""
+
+    @patch("tools.context.load_cache_file")
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    def test_concurrent_duplicates_load_once(
+        self,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        mock_load_cache: MagicMock,
+    ):
+        """Test concurrent fetches of the same URL load the cache file once."""
+        urls = [f"https://example.com/file{i}.txt" for i in range(4)]
+        mock_get_converter_opts.return_value = {}
+
+        def load(url, app_config):
+            time.sleep(0.01)
+            return f"# {url}"
+
+        mock_load_cache.side_effect = load
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(
+                executor.map(lambda i: fetch_context(urls[i % 4]), range(32))
+            )
+
+        assert mock_load_cache.call_count == len(urls)
+        assert results == [f"# {urls[i % 4]}" for i in range(32)]
+        assert not tools.context.fetch_futures
+
+    @patch("tools.context.load_cache_file")
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    def test_different_urls_load_in_parallel(
+        self,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        mock_load_cache: MagicMock,
+    ):
+        """Test a slow fetch does not hold up fetches of other URLs."""
+        urls = [f"https://example.com/file{i}.txt" for i in range(8)]
+        mock_get_converter_opts.return_value = {}
+        # every load waits until all of them are in flight at once
+        barrier = threading.Barrier(len(urls), timeout=5)
+
+        def load(url, app_config):
+            barrier.wait()
+            return f"# {url}"
+
+        mock_load_cache.side_effect = load
+
+        with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            results = list(executor.map(fetch_context, urls))
+
+        assert results == [f"# {url}" for url in urls]
+
+    @patch("tools.context.load_cache_file")
+    @patch("tools.context.get_app_config")
+    @patch("tools.context.get_converter_opts")
+    def test_concurrent_duplicates_share_error(
+        self,
+        mock_get_converter_opts: MagicMock,
+        mock_get_app_config: MagicMock,
+        mock_load_cache: MagicMock,
+    ):
+        """Test fetches waiting on a failed fetch get its error."""
+        url = "https://example.com/file.txt"
+        mock_get_converter_opts.return_value = {}
+        started = threading.Event()
+        release = threading.Event()
+
+        def load(url, app_config):
+            started.set()
+            release.wait(5)
+            raise ValueError("bad document")
+
+        mock_load_cache.side_effect = load
+        waiting = threading.Event()
+
+        class WatchedFuture(Future):
+            def result(self, timeout=None):
+                waiting.set()
+                return super().result(timeout)
+
+        with (
+            patch("tools.context.Future", WatchedFuture),
+            ThreadPoolExecutor(max_workers=2) as executor,
+        ):
+            leader = executor.submit(fetch_context, url)
+            started.wait(5)
+            waiter = executor.submit(fetch_context, url)
+            # let the first fetch fail once the second one waits on it
+            waiting.wait(5)
+            release.set()
+
+            with pytest.raises(ValueError, match="bad document"):
+                leader.result()
+            with pytest.raises(ValueError, match="bad document"):
+                waiter.result()
+
+        mock_load_cache.assert_called_once()
+        assert not tools.context.fetch_futures
+
+
+class TestContextCache:
+    """Test the in-process context cache."""
+
+    def test_get_cached_context_missing(self):
+        """Test a missing entry returns None."""
+        assert get_cached_context("https://example.com/file.txt") is None
+
+    def test_get_cached_context_expired(self):
+        """Test expired entries are dropped."""
+        url = "https://example.com/file.txt"
+        put_cached_context(url, "# Content")
+
+        expired = time.monotonic() + CONTEXT_CACHE_TTL + 1
+        with patch("tools.context.time.monotonic", return_value=expired):
+            assert get_cached_context(url) is None
+
+        assert url not in context_cache
+
+    def test_put_cached_context_evicts_oldest(self):
+        """Test the least recently used entry is evicted when full."""
+        with patch("tools.context.CONTEXT_CACHE_SIZE", 2):
+            put_cached_context("a", "A")
+            put_cached_context("b", "B")
+            get_cached_context("a")
+            put_cached_context("c", "C")
+
+        assert list(context_cache) == ["a", "c"]
+
+    def test_put_cached_context_evicts_by_size(self):
+        """Test entries are evicted once the cached markdown exceeds the budget."""
+        with patch("tools.context.CONTEXT_CACHE_MAX_CHARS", 10):
+            put_cached_context("a", "aaaa")
+            put_cached_context("b", "bbbb")
+            put_cached_context("c", "cccc")
+            put_cached_context("d", "d" * 11)
+
+        assert list(context_cache) == ["b", "c"]
+        assert tools.context.context_cache_chars == 8
+
+    def test_put_cached_context_replaces_entry(self):
+        """Test replacing an entry does not count its old contents."""
+        put_cached_context("a", "aaaa")
+        put_cached_context("a", "aa")
+
+        assert tools.context.context_cache_chars == 2
+
+
+class TestFetchContexts:
+    """Test the fetch_contexts function."""
+
+    @patch("tools.context.fetch_context")
+    async def test_fetch_contexts_preserves_order(self, mock_fetch_context: MagicMock):
+        """Test results come back in the order the URLs were given."""
+        mock_fetch_context.side_effect = lambda url, use_cache: f"# {url}"
+        urls = ["file:///a.txt", "file:///b.txt", "file:///c.txt"]
+
+        result = await fetch_contexts(urls, use_cache=False)
+
+        assert result == ["# file:///a.txt", "# file:///b.txt", "# file:///c.txt"]
+        mock_fetch_context.assert_any_call("file:///b.txt", False)
+
+    @patch("tools.context.fetch_context")
+    async def test_fetch_contexts_bounded(self, mock_fetch_context: MagicMock):
+        """Test no more than max_concurrency fetches run at once."""
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def fetch(url, use_cache):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.01)
+            with lock:
+                running -= 1
+            return "# Content"
+
+        mock_fetch_context.side_effect = fetch
+
+        await fetch_contexts([f"file:///{i}.txt" for i in range(6)], max_concurrency=2)
+
+        assert peak <= 2
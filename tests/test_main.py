@@ -1,8 +1,11 @@
 # type: ignore
-from unittest.mock import MagicMock, patch
+import runpy
+from types import SimpleNamespace
+from unittest.mock import patch
 
 import pytest
 
+import main
 from main import ContextBuilderMCPServer
 
 
@@ -14,69 +17,38 @@ class TestContextBuilderMCPServer:
         server = ContextBuilderMCPServer()
         assert isinstance(server, ContextBuilderMCPServer)
 
-    @patch("main.mcp")
-    @patch("main.get_app_config")
-    def test_run_with_stdio_transport(
-        self, mock_get_app_config: MagicMock, mock_mcp: MagicMock
-    ):
-        """Test running server with stdio transport."""
-        # Mock app config
-        mock_config = MagicMock()
-        mock_config.mcp_transport = "stdio"
-        mock_get_app_config.return_value = mock_config
+    @pytest.mark.parametrize("transport", ["stdio", "sse"])
+    def test_run_transport(self, transport, fake_mcp, fake_config):
+        """Test running server with each supported transport."""
+        fake_config.mcp_transport = transport
 
         server = ContextBuilderMCPServer()
         server.run()
 
-        mock_get_app_config.assert_called_once()
-        mock_mcp.run.assert_called_once_with(transport="stdio")
+        fake_mcp.run.assert_called_once_with(transport=transport)
 
-    @patch("main.mcp")
-    @patch("main.get_app_config")
-    def test_run_with_sse_transport(
-        self, mock_get_app_config: MagicMock, mock_mcp: MagicMock
-    ):
-        """Test running server with SSE transport."""
-        # Mock app config
-        mock_config = MagicMock()
-        mock_config.mcp_transport = "sse"
-        mock_get_app_config.return_value = mock_config
-
-        server = ContextBuilderMCPServer()
-        server.run()
+    def test_run_exception_handling(self, fake_mcp, monkeypatch):
+        """Test server run with exception."""
 
-        mock_get_app_config.assert_called_once()
-        mock_mcp.run.assert_called_once_with(transport="sse")
+        def get_app_config():
+            raise Exception("Config error")
 
-    @patch("main.mcp")
-    @patch("main.get_app_config")
-    def test_run_exception_handling(
-        self, mock_get_app_config: MagicMock, mock_mcp: MagicMock
-    ):
-        """Test server run with exception."""
-        mock_get_app_config.side_effect = Exception("Config error")
+        monkeypatch.setattr(main, "get_app_config", get_app_config)
 
         server = ContextBuilderMCPServer()
 
         with pytest.raises(Exception, match="Config error"):
             server.run()
 
-    @patch("main.mcp")
-    @patch("main.get_app_config")
-    def test_main_execution_block_coverage(
-        self, mock_get_app_config: MagicMock, mock_mcp: MagicMock
-    ):
-        """Test to cover the main execution block lines 12-13."""
-        # This test specifically targets the lines 12-13 in main.py
-        # which create a server instance and call run()
-
-        mock_config = MagicMock()
-        mock_config.mcp_transport = "stdio"
-        mock_get_app_config.return_value = mock_config
+        fake_mcp.run.assert_not_called()
 
-        # Simulate executing the main block - this effectively tests lines 12-13
-        server = ContextBuilderMCPServer()
-        server.run()
+    def test_main_execution_block(self):
+        """Test running main as a script starts the server."""
+        config = SimpleNamespace(mcp_transport="stdio")
+        with (
+            patch("common.get_app_config", return_value=config),
+            patch("server.mcp.run") as mock_run,
+        ):
+            runpy.run_module("main", run_name="__main__")
 
-        mock_get_app_config.assert_called_once()
-        mock_mcp.run.assert_called_once_with(transport="stdio")
+        mock_run.assert_called_once_with(transport="stdio")
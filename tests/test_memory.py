@@ -1,18 +1,27 @@
 # type: ignore
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import pytest
+from redis import BlockingConnectionPool, Connection, SSLConnection
 
 from tools.memory import (
+    AzureRedisCredentialProvider,
+    dump_json_value,
     fetch_blackboard,
     fetch_plan,
     fetch_result,
+    fetch_results,
+    get_azure_credential,
     get_redis_client,
     update_plan_status,
+    update_plan_statuses,
     write_context_description,
     write_plan,
     write_result,
+    write_results,
 )
 
 
@@ -30,7 +39,52 @@ class TestGetRedisClient:
         result = get_redis_client(mock_app_config)
 
         assert result == mock_redis_instance
-        mock_redis_class.assert_called_once_with(**mock_app_config.redis.model_dump())
+        pool = mock_redis_class.call_args.kwargs["connection_pool"]
+        assert isinstance(pool, BlockingConnectionPool)
+        assert pool.max_connections == mock_app_config.redis.max_connections
+        assert pool.timeout == mock_app_config.redis.socket_timeout
+        assert pool.connection_class is Connection
+        assert pool.connection_kwargs["host"] == mock_app_config.redis.host
+        assert "ssl_cert_reqs" not in pool.connection_kwargs
+        assert pool.connection_kwargs["socket_keepalive"] is True
+        assert pool.connection_kwargs["socket_keepalive_options"]
+        assert pool.connection_kwargs["health_check_interval"] == 30
+
+    @patch("tools.memory.Redis")
+    def test_get_redis_client_ssl(self, mock_redis_class: MagicMock, mock_app_config):
+        """Test get_redis_client uses SSL connections when configured."""
+        mock_app_config.redis.ssl = True
+
+        get_redis_client(mock_app_config)
+
+        pool = mock_redis_class.call_args.kwargs["connection_pool"]
+        assert pool.connection_class is SSLConnection
+        assert pool.connection_kwargs["ssl_cert_reqs"] == "required"
+
+    @patch("tools.memory.Redis")
+    def test_get_redis_client_client_cache(
+        self, mock_redis_class: MagicMock, mock_app_config
+    ):
+        """Test the client-side cache switches the pool to RESP3."""
+        mock_app_config.redis.client_cache_size = 1000
+
+        get_redis_client(mock_app_config)
+
+        pool = mock_redis_class.call_args.kwargs["connection_pool"]
+        assert pool.connection_kwargs["protocol"] == 3
+        assert pool.cache is not None
+        assert pool.cache.config.get_max_size() == 1000
+
+    @patch("tools.memory.Redis")
+    def test_get_redis_client_no_client_cache(
+        self, mock_redis_class: MagicMock, mock_app_config
+    ):
+        """Test the client-side cache is off by default."""
+        get_redis_client(mock_app_config)
+
+        pool = mock_redis_class.call_args.kwargs["connection_pool"]
+        assert "protocol" not in pool.connection_kwargs
+        assert pool.cache is None
 
     @patch("tools.memory.Redis")
     def test_get_redis_client_azure_redis(
@@ -41,17 +95,22 @@ class TestGetRedisClient:
         mock_redis_instance = MagicMock()
         mock_redis_class.return_value = mock_redis_instance
 
-        with patch("tools.memory.DefaultAzureCredential") as mock_cred_class:
+        with patch("azure.identity.DefaultAzureCredential") as mock_cred_class:
             mock_cred = MagicMock()
             mock_token = MagicMock()
             mock_token.token = "azure_token"
+            mock_token.expires_on = time.time() + 3600
             mock_cred.get_token.return_value = mock_token
             mock_cred_class.return_value = mock_cred
 
             result = get_redis_client(mock_app_config)
 
             assert result == mock_redis_instance
-            assert mock_app_config.redis.password == "azure_token"
+            pool = mock_redis_class.call_args.kwargs["connection_pool"]
+            provider = pool.connection_kwargs["credential_provider"]
+            assert isinstance(provider, AzureRedisCredentialProvider)
+            assert "password" not in pool.connection_kwargs
+            assert provider.get_credentials() == ("azure_token",)
             mock_cred.get_token.assert_called_once_with(
                 "https://redis.azure.com/.default"
             )
@@ -73,6 +132,125 @@ class TestGetRedisClient:
         # Redis should only be instantiated once
         assert mock_redis_class.call_count == 1
 
+    @patch("tools.memory.Redis")
+    def test_get_redis_client_concurrent_calls(
+        self, mock_redis_class: MagicMock, mock_app_config
+    ):
+        """Test concurrent first calls create a single client."""
+
+        def slow_redis(**kwargs):
+            time.sleep(0.01)
+            return MagicMock()
+
+        mock_redis_class.side_effect = slow_redis
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda _: get_redis_client(mock_app_config), range(8))
+            )
+
+        assert all(result is results[0] for result in results)
+        assert mock_redis_class.call_count == 1
+
+    @patch("tools.memory.Redis")
+    def test_get_redis_client_warms_up_pool(
+        self, mock_redis_class: MagicMock, mock_app_config
+    ):
+        """Test the connection pool is warmed up when the client is created."""
+        pool = mock_redis_class.return_value.connection_pool
+        connection = pool.get_connection.return_value
+
+        get_redis_client(mock_app_config)
+        get_redis_client(mock_app_config)
+
+        assert pool.get_connection.call_count == 4
+        assert connection.send_command.call_count == 4
+        assert pool.release.call_count == 4
+
+    @patch("tools.memory.Redis")
+    def test_get_redis_client_warm_up_failure(
+        self, mock_redis_class: MagicMock, mock_app_config
+    ):
+        """Test a failed warm up releases connections and is retried."""
+        pool = mock_redis_class.return_value.connection_pool
+        pool.get_connection.return_value.read_response.side_effect = [
+            ConnectionError("Connection refused"),
+            "PONG",
+            "PONG",
+            "PONG",
+            "PONG",
+        ]
+
+        with pytest.raises(ConnectionError):
+            get_redis_client(mock_app_config)
+
+        pool.release.assert_called_once()
+
+        get_redis_client(mock_app_config)
+
+        assert mock_redis_class.call_count == 2
+
+    def test_get_azure_credential_cached(self):
+        """Test the Azure credential is created once and reused."""
+        with patch("azure.identity.DefaultAzureCredential") as mock_cred_class:
+            cred1 = get_azure_credential()
+            cred2 = get_azure_credential()
+
+            assert cred1 is cred2
+            mock_cred_class.assert_called_once_with(
+                exclude_interactive_browser_credential=True,
+                exclude_visual_studio_code_credential=True,
+            )
+
+
+class TestAzureRedisCredentialProvider:
+    """Test the AzureRedisCredentialProvider class."""
+
+    def test_get_credentials_reuses_token(self):
+        """Test a valid token is reused across connections."""
+        with patch("azure.identity.DefaultAzureCredential") as mock_cred_class:
+            mock_cred = mock_cred_class.return_value
+            mock_cred.get_token.return_value = MagicMock(
+                token="azure_token", expires_on=time.time() + 3600
+            )
+            provider = AzureRedisCredentialProvider("user")
+
+            assert provider.get_credentials() == ("user", "azure_token")
+            assert provider.get_credentials() == ("user", "azure_token")
+            mock_cred.get_token.assert_called_once()
+
+    def test_get_credentials_refreshes_expiring_token(self):
+        """Test a token close to expiry is refreshed."""
+        with patch("azure.identity.DefaultAzureCredential") as mock_cred_class:
+            mock_cred = mock_cred_class.return_value
+            mock_cred.get_token.side_effect = [
+                MagicMock(token="old_token", expires_on=time.time() + 60),
+                MagicMock(token="new_token", expires_on=time.time() + 3600),
+            ]
+            provider = AzureRedisCredentialProvider()
+
+            assert provider.get_credentials() == ("old_token",)
+            assert provider.get_credentials() == ("new_token",)
+            assert mock_cred.get_token.call_count == 2
+
+
+class TestDumpJsonValue:
+    """Test the dump_json_value function."""
+
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [({"a": 1}, '{"a":1}'), ('{"a": 1}', '{"a": 1}'), ('"text"', '"text"')],
+    )
+    def test_dump_json_value(self, value, expected):
+        """Test that dicts are encoded and JSON strings are kept as given."""
+        assert dump_json_value(value, "Plan") == expected
+
+    @pytest.mark.parametrize("value", ["not json", 123, ["a"]])
+    def test_dump_json_value_invalid(self, value):
+        """Test that other values are rejected with the label in the message."""
+        with pytest.raises(ValueError, match="Result must be a JSON-serializable"):
+            dump_json_value(value, "Result")
+
 
 class TestWritePlan:
     """Test the write_plan function."""
@@ -92,8 +270,23 @@ class TestWritePlan:
         result = write_plan(plan_id, plan_data)
 
         assert result == "ok"
-        mock_redis.json().set.assert_called_once_with(plan_id, "$", plan_data)
-        mock_redis.expire.assert_called_once_with(plan_id, 3600)
+        mock_redis.set.assert_called_once_with(
+            plan_id, json.dumps(plan_data, separators=(",", ":")), ex=3600
+        )
+
+    @patch("tools.memory.from_json")
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_write_plan_dict_not_parsed(
+        self,
+        mock_get_config: MagicMock,
+        mock_get_redis: MagicMock,
+        mock_from_json: MagicMock,
+    ):
+        """Test that a dict plan is stored without going through the parser."""
+        write_plan("test-plan-id", {"id": 1, "goal": "test"})
+
+        mock_from_json.assert_not_called()
 
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
@@ -112,8 +305,7 @@ class TestWritePlan:
         result = write_plan(plan_id, plan_json)
 
         assert result == "ok"
-        mock_redis.json().set.assert_called_once_with(plan_id, "$", plan_data)
-        mock_redis.expire.assert_called_once_with(plan_id, 3600)
+        mock_redis.set.assert_called_once_with(plan_id, plan_json, ex=3600)
 
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
@@ -130,14 +322,23 @@ class TestWritePlan:
 class TestUpdatePlanStatus:
     """Test the update_plan_status function."""
 
+    @staticmethod
+    def run_transaction(mock_redis: MagicMock, plan: dict | None) -> MagicMock:
+        """Run the transaction callback against a pipeline holding the plan."""
+        mock_pipe = MagicMock()
+        mock_pipe.get.return_value = None if plan is None else json.dumps(plan)
+        mock_redis.transaction.side_effect = lambda func, *watches: func(mock_pipe)
+        return mock_pipe
+
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
     def test_update_plan_status_default(
-        self, mock_get_config: MagicMock, mock_get_redis: MagicMock
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock, sample_plan_data
     ):
         """Test updating plan status with default status."""
         mock_redis = MagicMock()
         mock_get_redis.return_value = mock_redis
+        mock_pipe = self.run_transaction(mock_redis, sample_plan_data)
 
         plan_id = "test-plan-id"
         step_id = 1
@@ -145,30 +346,97 @@ class TestUpdatePlanStatus:
         result = update_plan_status(plan_id, step_id)
 
         assert result == "ok"
-        mock_redis.json().set.assert_called_once_with(
-            plan_id, ".steps.[0].status", "completed"
-        )
+        assert mock_redis.transaction.call_args.args[1] == plan_id
+        mock_pipe.multi.assert_called_once()
+        data, kwargs = mock_pipe.set.call_args.args[1], mock_pipe.set.call_args.kwargs
+        assert json.loads(data)["steps"][0]["status"] == "completed"
+        assert kwargs == {"keepttl": True}
 
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
     def test_update_plan_status_custom(
-        self, mock_get_config: MagicMock, mock_get_redis: MagicMock
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock, sample_plan_data
     ):
         """Test updating plan status with custom status."""
         mock_redis = MagicMock()
         mock_get_redis.return_value = mock_redis
+        mock_pipe = self.run_transaction(mock_redis, sample_plan_data)
 
-        plan_id = "test-plan-id"
-        step_id = 2
-        status = "failed"
-
-        result = update_plan_status(plan_id, step_id, status)
+        result = update_plan_status("test-plan-id", 1, "failed")
 
         assert result == "ok"
-        mock_redis.json().set.assert_called_once_with(
-            plan_id, ".steps.[1].status", "failed"
+        assert json.loads(mock_pipe.set.call_args.args[1])["steps"][0]["status"] == (
+            "failed"
         )
 
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_update_plan_status_plan_not_found(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock
+    ):
+        """Test updating a plan that does not exist."""
+        mock_redis = MagicMock()
+        mock_get_redis.return_value = mock_redis
+        mock_pipe = self.run_transaction(mock_redis, None)
+
+        with pytest.raises(ValueError, match="Plan test-plan-id not found"):
+            update_plan_status("test-plan-id", 1)
+
+        mock_pipe.set.assert_not_called()
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_update_plan_status_step_not_found(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock, sample_plan_data
+    ):
+        """Test updating a step that does not exist."""
+        mock_redis = MagicMock()
+        mock_get_redis.return_value = mock_redis
+        mock_pipe = self.run_transaction(mock_redis, sample_plan_data)
+
+        with pytest.raises(ValueError, match="Step 2 not found"):
+            update_plan_status("test-plan-id", 2)
+
+        mock_pipe.set.assert_not_called()
+
+
+class TestUpdatePlanStatuses:
+    """Test the update_plan_statuses function."""
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_update_plan_statuses(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock, sample_plan_data
+    ):
+        """Test several steps are updated with a single write."""
+        sample_plan_data["steps"].append({**sample_plan_data["steps"][0], "id": 2})
+        mock_redis = MagicMock()
+        mock_get_redis.return_value = mock_redis
+        mock_pipe = TestUpdatePlanStatus.run_transaction(mock_redis, sample_plan_data)
+
+        result = update_plan_statuses("test-plan-id", [(1, "completed"), (2, "failed")])
+
+        assert result == "ok"
+        mock_redis.transaction.assert_called_once()
+        mock_pipe.set.assert_called_once()
+        steps = json.loads(mock_pipe.set.call_args.args[1])["steps"]
+        assert [step["status"] for step in steps] == ["completed", "failed"]
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_update_plan_statuses_invalid_step(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock, sample_plan_data
+    ):
+        """Test no step is written when any step does not exist."""
+        mock_redis = MagicMock()
+        mock_get_redis.return_value = mock_redis
+        mock_pipe = TestUpdatePlanStatus.run_transaction(mock_redis, sample_plan_data)
+
+        with pytest.raises(ValueError, match="Step 5 not found"):
+            update_plan_statuses("test-plan-id", [(1, "completed"), (5, "completed")])
+
+        mock_pipe.set.assert_not_called()
+
 
 class TestWriteContextDescription:
     """Test the write_context_description function."""
@@ -193,10 +461,13 @@ class TestWriteContextDescription:
         expected_b_key = f"blackboard|{plan_id}".lower()
         expected_v_key = f"context|{plan_id}|{file_path}"
 
-        mock_redis.hset.assert_called_once_with(
+        mock_pipe = mock_redis.pipeline.return_value
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        mock_pipe.hset.assert_called_once_with(
             expected_b_key, expected_v_key, description
         )
-        mock_redis.expire.assert_called_once_with(expected_b_key, 3600)
+        mock_pipe.expire.assert_called_once_with(expected_b_key, 3600)
+        mock_pipe.execute.assert_called_once()
 
 
 class TestWriteResult:
@@ -223,13 +494,16 @@ class TestWriteResult:
         assert result == "ok"
         expected_b_key = f"blackboard|{plan_id}".lower()
         expected_v_key = f"result|{plan_id}|{step_id}|{agent_name}".lower()
-        expected_data = json.dumps(result_data)
+        expected_data = json.dumps(result_data, separators=(",", ":"))
 
-        mock_redis.hset.assert_called_once_with(
-            expected_b_key, expected_v_key, description
+        mock_pipe = mock_redis.pipeline.return_value
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        mock_pipe.hset.assert_called_once_with(
+            expected_b_key, mapping={expected_v_key: description}
         )
-        mock_redis.set.assert_called_once_with(expected_v_key, expected_data)
-        assert mock_redis.expire.call_count == 2
+        mock_pipe.set.assert_called_once_with(expected_v_key, expected_data, ex=3600)
+        mock_pipe.expire.assert_called_once_with(expected_b_key, 3600)
+        mock_pipe.execute.assert_called_once()
 
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
@@ -254,11 +528,14 @@ class TestWriteResult:
         expected_b_key = f"blackboard|{plan_id}".lower()
         expected_v_key = f"result|{plan_id}|{step_id}|{agent_name}".lower()
 
-        mock_redis.hset.assert_called_once_with(
-            expected_b_key, expected_v_key, description
+        mock_pipe = mock_redis.pipeline.return_value
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        mock_pipe.hset.assert_called_once_with(
+            expected_b_key, mapping={expected_v_key: description}
         )
-        mock_redis.set.assert_called_once_with(expected_v_key, result_data)
-        assert mock_redis.expire.call_count == 2
+        mock_pipe.set.assert_called_once_with(expected_v_key, result_json, ex=3600)
+        mock_pipe.expire.assert_called_once_with(expected_b_key, 3600)
+        mock_pipe.execute.assert_called_once()
 
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
@@ -293,6 +570,67 @@ class TestWriteResult:
             write_result(plan_id, agent_name, step_id, description, "invalid json")
 
 
+class TestWriteResults:
+    """Test the write_results function."""
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_write_results(self, mock_get_config: MagicMock, mock_get_redis: MagicMock):
+        """Test that several results are written in one pipeline."""
+        mock_redis = MagicMock()
+        mock_get_redis.return_value = mock_redis
+
+        result = write_results(
+            "Plan-1",
+            [
+                (1, "researcher", "Research", {"data": "test"}),
+                (2, "Writer", "Draft", '"text"'),
+            ],
+        )
+
+        assert result == "ok"
+        mock_pipe = mock_redis.pipeline.return_value
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        mock_pipe.hset.assert_called_once_with(
+            "blackboard|plan-1",
+            mapping={
+                "result|plan-1|1|researcher": "Research",
+                "result|plan-1|2|writer": "Draft",
+            },
+        )
+        mock_pipe.expire.assert_called_once_with("blackboard|plan-1", 3600)
+        assert mock_pipe.set.call_args_list == [
+            (("result|plan-1|1|researcher", '{"data":"test"}'), {"ex": 3600}),
+            (("result|plan-1|2|writer", '"text"'), {"ex": 3600}),
+        ]
+        mock_pipe.execute.assert_called_once()
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_write_results_invalid_entry(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock
+    ):
+        """Test that nothing is written when any result is invalid."""
+        with pytest.raises(
+            ValueError, match="Result must be a JSON-serializable object"
+        ):
+            write_results(
+                "plan-1",
+                [(1, "researcher", "Research", {}), (2, "writer", "Draft", "bad")],
+            )
+
+        mock_get_redis.assert_not_called()
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_write_results_empty(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock
+    ):
+        """Test that no entries skips the round trip."""
+        assert write_results("plan-1", []) == "ok"
+        mock_get_redis.assert_not_called()
+
+
 class TestFetchPlan:
     """Test the fetch_plan function."""
 
@@ -304,13 +642,13 @@ class TestFetchPlan:
         mock_get_redis.return_value = mock_redis
 
         plan_data = {"id": 1, "goal": "test"}
-        mock_redis.json().get.return_value = plan_data
+        mock_redis.get.return_value = json.dumps(plan_data)
 
         plan_id = "test-plan-id"
         result = fetch_plan(plan_id)
 
         assert result == plan_data
-        mock_redis.json().get.assert_called_once_with(plan_id)
+        mock_redis.get.assert_called_once_with(plan_id)
 
     @patch("tools.memory.get_redis_client")
     @patch("tools.memory.get_app_config")
@@ -321,7 +659,7 @@ class TestFetchPlan:
         mock_redis = MagicMock()
         mock_get_redis.return_value = mock_redis
 
-        mock_redis.json().get.return_value = None
+        mock_redis.get.return_value = None
 
         plan_id = "nonexistent-plan-id"
         result = fetch_plan(plan_id)
@@ -348,7 +686,7 @@ class TestFetchBlackboard:
         result = fetch_blackboard(plan_id)
 
         expected_b_key = f"blackboard|{plan_id}".lower()
-        expected_result = json.dumps(blackboard_data)
+        expected_result = json.dumps(blackboard_data, separators=(",", ":"))
 
         assert result == expected_result
         mock_redis.hgetall.assert_called_once_with(expected_b_key)
@@ -380,8 +718,8 @@ class TestFetchResult:
         mock_redis = MagicMock()
         mock_get_redis.return_value = mock_redis
 
-        result_data = {"data": "test"}
-        mock_redis.get.return_value = result_data
+        result_json = '{"data":"test"}'
+        mock_redis.get.return_value = result_json
 
         plan_id = "test-plan-id"
         agent_name = "researcher"
@@ -390,9 +728,9 @@ class TestFetchResult:
         result = fetch_result(plan_id, agent_name, step_id)
 
         expected_v_key = f"result|{plan_id}|{step_id}|{agent_name}".lower()
-        expected_result = json.dumps(result_data)
 
-        assert result == expected_result
+        # the stored JSON is returned as is, not encoded a second time
+        assert result == result_json
         mock_redis.get.assert_called_once_with(expected_v_key)
 
     @patch("tools.memory.get_redis_client")
@@ -412,7 +750,35 @@ class TestFetchResult:
 
         result = fetch_result(plan_id, agent_name, step_id)
 
-        assert result == json.dumps(None)
+        assert result is None
+
+
+class TestFetchResults:
+    """Test the fetch_results function."""
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_fetch_results(self, mock_get_config: MagicMock, mock_get_redis: MagicMock):
+        """Test fetching several results with one MGET."""
+        mock_redis = MagicMock()
+        mock_get_redis.return_value = mock_redis
+        mock_redis.mget.return_value = ['{"data":"a"}', None]
+
+        result = fetch_results("Plan-ID", [(1, "Researcher"), (2, "writer")])
+
+        assert result == ['{"data":"a"}', None]
+        mock_redis.mget.assert_called_once_with(
+            ["result|plan-id|1|researcher", "result|plan-id|2|writer"]
+        )
+
+    @patch("tools.memory.get_redis_client")
+    @patch("tools.memory.get_app_config")
+    def test_fetch_results_empty(
+        self, mock_get_config: MagicMock, mock_get_redis: MagicMock
+    ):
+        """Test fetching no results skips Redis."""
+        assert fetch_results("plan-id", []) == []
+        mock_get_redis.assert_not_called()
 
 
 class TestMemoryModuleEdgeCases:
@@ -32,6 +32,10 @@ class TestRedisConfig:
         assert config.ssl_certfile is None
         assert config.ssl_keyfile is None
         assert config.socket_timeout == 10
+        assert config.socket_keepalive is True
+        assert config.health_check_interval == 30
+        assert config.client_name == "mcp-blackboard"
+        assert config.client_cache_size == 0
         assert config.retry_on_timeout is True
         assert config.max_connections == 20
         assert config.decode_responses is True
@@ -166,6 +170,19 @@ class TestAppConfig:
         assert isinstance(config.storage, StorageConfig)
         assert isinstance(config.converter, ConverterConfig)
 
+    def test_app_config_cache_protocol_path(self):
+        """Test AppConfig splits the cache path into protocol and path."""
+        config = AppConfig(
+            cache_path="s3://bucket/cache",
+            mcp_transport="stdio",
+            redis=RedisConfig(host="localhost"),
+            storage=StorageConfig(),
+            converter=ConverterConfig(),
+        )
+
+        assert config.cache_protocol_path == ("s3", "bucket/cache")
+        assert "cache_protocol_path" not in config.model_dump()
+
     def test_app_config_invalid_transport(self):
         """Test AppConfig with invalid transport."""
         with pytest.raises(ValidationError):
@@ -260,6 +277,13 @@ class TestPlanStep:
                 status="invalid_status",
             )
 
+    def test_plan_step_is_frozen(self):
+        """Test PlanStep fields cannot be reassigned."""
+        step = PlanStep(id=1, agent="researcher", prompt="Test prompt")
+
+        with pytest.raises(ValidationError):
+            step.status = "completed"
+
 
 class TestPlan:
     """Test the Plan model."""
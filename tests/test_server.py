@@ -1,111 +1,119 @@
 # type: ignore
+import asyncio
 import inspect
-from unittest.mock import Mock, patch
+import threading
+from unittest.mock import patch
 
 import pytest
 
 from server import (
     get_blackboard,
     get_context,
+    get_contexts,
     get_plan,
     get_result,
+    get_results,
+    lifespan,
     mark_plan_as_completed,
+    mark_plan_steps_as_completed,
     mcp,
     remove_stale_files,
+    remove_stale_files_job,
     save_context_description,
     save_plan,
     save_result,
+    save_results,
+    scheduler,
+    trigger,
 )
 
 
 class TestRemoveStaleFiles:
     """Test the remove_stale_files function."""
 
-    @patch("server.get_app_config")
-    @patch("server.get_filesystem")
-    def test_remove_stale_files_default_age(
-        self, mock_get_filesystem, mock_get_app_config, mock_app_config
+    @pytest.mark.parametrize(
+        ("ages", "max_age", "removed"),
+        [
+            ([4000, 1000], 3600, ["file0.txt"]),
+            ([1800], 900, ["file0.txt"]),
+            ([1000, 1000], 3600, []),
+            ([7200, 60, 5400], 3600, ["file0.txt", "file2.txt"]),
+            ([1800], 3600, []),
+        ],
+    )
+    def test_remove_stale_files(
+        self, mock_cache_fs, mock_file_age, ages, max_age, removed
     ):
-        """Test removing stale files with default max age."""
-        # Setup mocks
-        mock_get_app_config.return_value = mock_app_config
-        mock_app_config.cache_path = "file:///tmp/cache"
-
-        mock_fs = Mock()
-        mock_get_filesystem.return_value = mock_fs
-
-        # Mock file list with one old file and one new file
-        mock_fs.listdir.return_value = [
-            {"name": "old_file.txt"},
-            {"name": "new_file.txt"},
+        """Test files older than max_age are removed with a single bulk call."""
+        mock_cache_fs.listdir.return_value = [
+            {"name": f"file{i}.txt"} for i in range(len(ages))
         ]
+        mock_file_age.side_effect = ages
 
-        # Mock get_file_age to return different ages
-        with patch("server.get_file_age") as mock_get_file_age:
-            mock_get_file_age.side_effect = [
-                4000,
-                1000,
-            ]  # old file > 3600, new file < 3600
+        remove_stale_files(max_age)
 
-            # Call function
-            remove_stale_files()
-
-            # Verify filesystem operations
-            mock_fs.listdir.assert_called_once_with("/tmp/cache")
-            mock_fs.rm.assert_called_once_with("old_file.txt")
+        if removed:
+            mock_cache_fs.rm.assert_called_once_with(removed)
+        else:
+            mock_cache_fs.rm.assert_not_called()
 
-    @patch("server.get_app_config")
-    @patch("server.get_filesystem")
-    def test_remove_stale_files_custom_age(
-        self, mock_get_filesystem, mock_get_app_config, mock_app_config
+    def test_remove_stale_files_lists_cache_path(
+        self, mock_cache_fs, mock_file_age, mock_app_config
     ):
-        """Test removing stale files with custom max age."""
-        # Setup mocks
-        mock_get_app_config.return_value = mock_app_config
+        """Test the cache path is listed once, without its protocol."""
         mock_app_config.cache_path = "s3://bucket/cache"
+        mock_cache_fs.listdir.return_value = []
 
-        mock_fs = Mock()
-        mock_get_filesystem.return_value = mock_fs
-
-        mock_fs.listdir.return_value = [{"name": "test_file.txt"}]
+        remove_stale_files()
 
-        with patch("server.get_file_age") as mock_get_file_age:
-            mock_get_file_age.return_value = 1800  # 30 minutes
+        mock_cache_fs.listdir.assert_called_once_with("bucket/cache")
+        mock_file_age.assert_not_called()
 
-            # Call function with custom max_age
-            remove_stale_files(max_age=900)  # 15 minutes
-
-            # Should remove the file since 1800 > 900
-            mock_fs.rm.assert_called_once_with("test_file.txt")
-
-    @patch("server.get_app_config")
-    @patch("server.get_filesystem")
-    def test_remove_stale_files_no_old_files(
-        self, mock_get_filesystem, mock_get_app_config, mock_app_config
+    def test_remove_stale_files_memory_filesystem(
+        self, memfs, mock_file_age, mock_app_config
     ):
-        """Test when no files are old enough to remove."""
-        # Setup mocks
-        mock_get_app_config.return_value = mock_app_config
-        mock_app_config.cache_path = "file:///tmp/cache"
+        """Test the sweep against a real fsspec filesystem."""
+        mock_app_config.cache_path = "memory:///tmp/cache"
+        memfs.pipe_file("/tmp/cache/old.md.gz", b"old")
+        memfs.pipe_file("/tmp/cache/new.md.gz", b"new")
+        memfs.pipe_file("/tmp/cache/subdir/keep.md.gz", b"keep")
+        ages = {"/tmp/cache/old.md.gz": 7200, "/tmp/cache/new.md.gz": 60}
+        mock_file_age.side_effect = lambda file_info, now: ages[file_info["name"]]
+
+        with (
+            patch("server.get_app_config", return_value=mock_app_config),
+            patch("server.get_filesystem", return_value=memfs),
+        ):
+            remove_stale_files()
 
-        mock_fs = Mock()
-        mock_get_filesystem.return_value = mock_fs
+        assert not memfs.exists("/tmp/cache/old.md.gz")
+        assert memfs.exists("/tmp/cache/new.md.gz")
+        assert memfs.exists("/tmp/cache/subdir/keep.md.gz")
 
-        mock_fs.listdir.return_value = [{"name": "file1.txt"}, {"name": "file2.txt"}]
+    def test_remove_stale_files_filesystem_error(self, mock_cache_fs):
+        """Test a failed listing is raised to the scheduler."""
+        mock_cache_fs.listdir.side_effect = OSError("Permission denied")
 
-        with patch("server.get_file_age") as mock_get_file_age:
-            mock_get_file_age.return_value = 1000  # All files are new
+        with pytest.raises(OSError):
+            remove_stale_files(3600)
 
-            remove_stale_files()
+    def test_remove_stale_files_skips_directories(self, mock_cache_fs, mock_file_age):
+        """Test sub-directories in the cache are left alone."""
+        mock_cache_fs.listdir.return_value = [
+            {"name": "old.md", "type": "file"},
+            {"name": "subdir", "type": "directory"},
+        ]
+        mock_file_age.return_value = 7200
+
+        remove_stale_files()
 
-            # No files should be removed
-            mock_fs.rm.assert_not_called()
+        mock_cache_fs.rm.assert_called_once_with(["old.md"])
+        mock_file_age.assert_called_once()
 
 
 class TestSavePlanTool:
     """Test the save_plan MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.write_plan")
     async def test_save_plan_with_dict(self, mock_write_plan):
         """Test saving a plan with a dict input."""
@@ -136,7 +144,6 @@ class TestSavePlanTool:
         assert isinstance(args[1], dict)
         assert args[1]["goal"] == "Test Plan Goal"
 
-    @pytest.mark.asyncio
     @patch("server.write_plan")
     async def test_save_plan_with_json_string(self, mock_write_plan):
         """Test saving a plan with a JSON string input."""
@@ -161,33 +168,25 @@ class TestSavePlanTool:
         assert result == "Plan saved successfully"
         mock_write_plan.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_save_plan_invalid_dict(self):
-        """Test saving a plan with invalid dict data."""
-        invalid_plan = {"invalid": "data"}
-
+    @pytest.mark.parametrize(
+        "bad_input",
+        [
+            {"invalid": "data"},
+            {"invalid_field": "value"},
+            "not json",
+            '{"id": 1, "goal": "test"',
+            12345,
+        ],
+    )
+    async def test_save_plan_invalid(self, bad_input):
+        """Test saving a plan that does not match the Plan model."""
         with pytest.raises(ValueError, match="Plan must be a JSON-serializable object"):
-            await save_plan("plan123", invalid_plan)
-
-    @pytest.mark.asyncio
-    async def test_save_plan_invalid_json_string(self):
-        """Test saving a plan with invalid JSON string."""
-        invalid_json = "not json"
-
-        with pytest.raises(ValueError, match="Plan must be a JSON-serializable object"):
-            await save_plan("plan123", invalid_json)
-
-    @pytest.mark.asyncio
-    async def test_save_plan_invalid_type(self):
-        """Test saving a plan with invalid data type."""
-        with pytest.raises(ValueError, match="Plan must be a JSON-serializable object"):
-            await save_plan("plan123", 12345)  # type: ignore
+            await save_plan("plan123", bad_input)
 
 
 class TestMarkPlanAsCompletedTool:
     """Test the mark_plan_as_completed MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.update_plan_status")
     async def test_mark_plan_as_completed_success(self, mock_update_plan_status):
         """Test successfully marking a plan step as completed."""
@@ -198,7 +197,6 @@ class TestMarkPlanAsCompletedTool:
         assert result == "Step marked as completed"
         mock_update_plan_status.assert_called_once_with("plan123", 1)
 
-    @pytest.mark.asyncio
     @patch("server.update_plan_status")
     async def test_mark_plan_as_completed_zero_step_id(self, mock_update_plan_status):
         """Test marking a plan step as completed with step_id 0."""
@@ -210,10 +208,25 @@ class TestMarkPlanAsCompletedTool:
         mock_update_plan_status.assert_called_once_with("plan123", 0)
 
 
+class TestMarkPlanStepsAsCompletedTool:
+    """Test the mark_plan_steps_as_completed MCP tool."""
+
+    @patch("server.update_plan_statuses")
+    async def test_mark_plan_steps_as_completed(self, mock_update_plan_statuses):
+        """Test marking several steps as completed."""
+        mock_update_plan_statuses.return_value = "ok"
+
+        result = await mark_plan_steps_as_completed("plan123", [1, 2])
+
+        assert result == "ok"
+        mock_update_plan_statuses.assert_called_once_with(
+            "plan123", [(1, "completed"), (2, "completed")]
+        )
+
+
 class TestSaveResultTool:
     """Test the save_result MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.write_result")
     async def test_save_result_with_string(self, mock_write_result):
         """Test saving a result with string data."""
@@ -228,7 +241,6 @@ class TestSaveResultTool:
             "plan123", "agent1", 1, "Test result", "Some text result"
         )
 
-    @pytest.mark.asyncio
     @patch("server.write_result")
     async def test_save_result_with_dict(self, mock_write_result):
         """Test saving a result with dict data."""
@@ -242,7 +254,6 @@ class TestSaveResultTool:
             "plan123", "agent1", 1, "Test result", result_data
         )
 
-    @pytest.mark.asyncio
     @patch("server.write_result")
     async def test_save_result_empty_description(self, mock_write_result):
         """Test saving a result with empty description."""
@@ -256,10 +267,24 @@ class TestSaveResultTool:
         )
 
 
+class TestSaveResultsTool:
+    """Test the save_results MCP tool."""
+
+    @patch("server.write_results")
+    async def test_save_results(self, mock_write_results):
+        """Test saving several results at once."""
+        mock_write_results.return_value = "ok"
+        entries = [(1, "agent1", "First", "text"), (2, "agent2", "Second", {"a": 1})]
+
+        result = await save_results("plan123", entries)
+
+        assert result == "ok"
+        mock_write_results.assert_called_once_with("plan123", entries)
+
+
 class TestSaveContextDescriptionTool:
     """Test the save_context_description MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.write_context_description")
     async def test_save_context_description_file_path(
         self, mock_write_context_description
@@ -276,7 +301,6 @@ class TestSaveContextDescriptionTool:
             "plan123", "/path/to/file.txt", "This is a test file"
         )
 
-    @pytest.mark.asyncio
     @patch("server.write_context_description")
     async def test_save_context_description_url(self, mock_write_context_description):
         """Test saving context description for a URL."""
@@ -291,7 +315,6 @@ class TestSaveContextDescriptionTool:
             "plan123", "https://example.com/file.pdf", "This is a PDF document"
         )
 
-    @pytest.mark.asyncio
     @patch("server.write_context_description")
     async def test_save_context_description_empty_description(
         self, mock_write_context_description
@@ -310,7 +333,6 @@ class TestSaveContextDescriptionTool:
 class TestGetBlackboardTool:
     """Test the get_blackboard MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.fetch_blackboard")
     async def test_get_blackboard_found(self, mock_fetch_blackboard):
         """Test fetching existing blackboard data."""
@@ -322,7 +344,6 @@ class TestGetBlackboardTool:
         assert result == expected_data
         mock_fetch_blackboard.assert_called_once_with("plan123")
 
-    @pytest.mark.asyncio
     @patch("server.fetch_blackboard")
     async def test_get_blackboard_not_found(self, mock_fetch_blackboard):
         """Test fetching non-existent blackboard data."""
@@ -333,7 +354,6 @@ class TestGetBlackboardTool:
         assert result is None
         mock_fetch_blackboard.assert_called_once_with("nonexistent")
 
-    @pytest.mark.asyncio
     @patch("server.fetch_blackboard")
     async def test_get_blackboard_string_result(self, mock_fetch_blackboard):
         """Test fetching blackboard data that returns a string."""
@@ -348,7 +368,6 @@ class TestGetBlackboardTool:
 class TestGetPlanTool:
     """Test the get_plan MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.fetch_plan")
     async def test_get_plan_found(self, mock_fetch_plan):
         """Test fetching existing plan data."""
@@ -360,7 +379,6 @@ class TestGetPlanTool:
         assert result == expected_plan
         mock_fetch_plan.assert_called_once_with("plan123")
 
-    @pytest.mark.asyncio
     @patch("server.fetch_plan")
     async def test_get_plan_not_found(self, mock_fetch_plan):
         """Test fetching non-existent plan data."""
@@ -371,7 +389,6 @@ class TestGetPlanTool:
         assert result is None
         mock_fetch_plan.assert_called_once_with("nonexistent")
 
-    @pytest.mark.asyncio
     @patch("server.fetch_plan")
     async def test_get_plan_string_result(self, mock_fetch_plan):
         """Test fetching plan data that returns a string."""
@@ -386,7 +403,6 @@ class TestGetPlanTool:
 class TestGetResultTool:
     """Test the get_result MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.fetch_result")
     async def test_get_result_found(self, mock_fetch_result):
         """Test fetching existing result data."""
@@ -398,7 +414,6 @@ class TestGetResultTool:
         assert result == expected_result
         mock_fetch_result.assert_called_once_with("plan123", "agent1", 1)
 
-    @pytest.mark.asyncio
     @patch("server.fetch_result")
     async def test_get_result_not_found(self, mock_fetch_result):
         """Test fetching non-existent result data."""
@@ -409,7 +424,6 @@ class TestGetResultTool:
         assert result is None
         mock_fetch_result.assert_called_once_with("plan123", "agent1", 1)
 
-    @pytest.mark.asyncio
     @patch("server.fetch_result")
     async def test_get_result_string_result(self, mock_fetch_result):
         """Test fetching result data that returns a string."""
@@ -420,7 +434,6 @@ class TestGetResultTool:
         assert result == "string result data"
         mock_fetch_result.assert_called_once_with("plan123", "agent1", 1)
 
-    @pytest.mark.asyncio
     @patch("server.fetch_result")
     async def test_get_result_zero_step_id(self, mock_fetch_result):
         """Test fetching result with step_id 0."""
@@ -433,10 +446,24 @@ class TestGetResultTool:
         mock_fetch_result.assert_called_once_with("plan123", "agent1", 0)
 
 
+class TestGetResultsTool:
+    """Test the get_results MCP tool."""
+
+    @patch("server.fetch_results")
+    async def test_get_results(self, mock_fetch_results):
+        """Test fetching several results at once."""
+        mock_fetch_results.return_value = ['{"a":1}', None]
+        steps = [(1, "researcher"), (2, "writer")]
+
+        result = await get_results("plan123", steps)
+
+        assert result == ['{"a":1}', None]
+        mock_fetch_results.assert_called_once_with("plan123", steps)
+
+
 class TestGetContextTool:
     """Test the get_context MCP tool."""
 
-    @pytest.mark.asyncio
     @patch("server.fetch_context")
     async def test_get_context_default_cache(self, mock_fetch_context):
         """Test fetching context with default cache setting."""
@@ -449,7 +476,6 @@ class TestGetContextTool:
         assert result == "# Document Content\n\nThis is markdown content."
         mock_fetch_context.assert_called_once_with("/path/to/document.pdf", True)
 
-    @pytest.mark.asyncio
     @patch("server.fetch_context")
     async def test_get_context_cache_enabled(self, mock_fetch_context):
         """Test fetching context with cache enabled."""
@@ -460,7 +486,6 @@ class TestGetContextTool:
         assert result == "# Cached Content\n\nThis is cached markdown."
         mock_fetch_context.assert_called_once_with("https://example.com/doc.html", True)
 
-    @pytest.mark.asyncio
     @patch("server.fetch_context")
     async def test_get_context_cache_disabled(self, mock_fetch_context):
         """Test fetching context with cache disabled."""
@@ -471,28 +496,27 @@ class TestGetContextTool:
         assert result == "# Fresh Content\n\nThis is fresh markdown."
         mock_fetch_context.assert_called_once_with("s3://bucket/document.docx", False)
 
-    @pytest.mark.asyncio
-    @patch("server.fetch_context")
-    async def test_get_context_various_file_types(self, mock_fetch_context):
-        """Test fetching context for various file types."""
-        mock_fetch_context.return_value = "# Converted Content"
-
-        file_types = [
+    @pytest.mark.parametrize(
+        "file_path",
+        [
             "/path/to/file.pdf",
             "https://example.com/image.jpg",
             "s3://bucket/spreadsheet.xlsx",
             "gcs://bucket/presentation.pptx",
             "file:///local/text.txt",
             "abfs://container/data.csv",
-        ]
+        ],
+    )
+    @patch("server.fetch_context")
+    async def test_get_context_various_file_types(self, mock_fetch_context, file_path):
+        """Test fetching context for various file types."""
+        mock_fetch_context.return_value = "# Converted Content"
 
-        for file_path in file_types:
-            result = await get_context(file_path)
-            assert result == "# Converted Content"
+        result = await get_context(file_path)
 
-        assert mock_fetch_context.call_count == len(file_types)
+        assert result == "# Converted Content"
+        mock_fetch_context.assert_called_once_with(file_path, True)
 
-    @pytest.mark.asyncio
     @patch("server.fetch_context")
     async def test_get_context_error_handling(self, mock_fetch_context):
         """Test error handling in get_context."""
@@ -501,7 +525,6 @@ class TestGetContextTool:
         with pytest.raises(OSError, match="File not found"):
             await get_context("/nonexistent/file.pdf")
 
-    @pytest.mark.asyncio
     @patch("server.fetch_context")
     async def test_get_context_value_error(self, mock_fetch_context):
         """Test ValueError handling in get_context."""
@@ -511,6 +534,21 @@ class TestGetContextTool:
             await get_context("invalid://url")
 
 
+class TestGetContextsTool:
+    """Test the get_contexts MCP tool."""
+
+    @patch("server.fetch_contexts")
+    async def test_get_contexts(self, mock_fetch_contexts):
+        """Test fetching several contexts at once."""
+        mock_fetch_contexts.return_value = ["# A", "# B"]
+        urls = ["https://example.com/a.pdf", "https://example.com/b.pdf"]
+
+        result = await get_contexts(urls, use_cache=False)
+
+        assert result == ["# A", "# B"]
+        mock_fetch_contexts.assert_called_once_with(urls, False)
+
+
 class TestMCPServerConfiguration:
     """Test the FastMCP server configuration."""
 
@@ -530,7 +568,6 @@ class TestMCPServerConfiguration:
         """Test that the MCP server is properly configured with lifespan."""
         # The lifespan is passed to FastMCP during initialization but may not be
         # accessible as a public attribute. We verify it through the scheduler test.
-        from server import lifespan, scheduler
 
         # Verify the lifespan function exists and is callable
         assert callable(lifespan)
@@ -538,75 +575,97 @@ class TestMCPServerConfiguration:
         # Verify the scheduler exists (used in lifespan)
         assert scheduler is not None
 
-    @pytest.mark.asyncio
     async def test_mcp_lifespan_context_manager(self):
         """Test the lifespan context manager functionality."""
-        from server import lifespan, scheduler
 
         # Mock the scheduler
-        with patch.object(scheduler, "shutdown") as mock_shutdown:
+        with (
+            patch.object(scheduler, "add_job") as mock_add_job,
+            patch.object(scheduler, "start") as mock_start,
+            patch.object(scheduler, "shutdown") as mock_shutdown,
+        ):
             async with lifespan(mcp):
-                # The context manager should yield without doing anything
-                pass
+                # The scheduler should be started on entry
+                mock_add_job.assert_called_once()
+                mock_start.assert_called_once()
+                mock_shutdown.assert_not_called()
 
             # After exiting, scheduler.shutdown should be called
             mock_shutdown.assert_called_once()
 
-    def test_mcp_server_tools_registered(self):
-        """Test that all expected tools are registered with the MCP server."""
-        # Note: This test verifies the tools are decorated correctly
-        # The actual tool registration is handled by the FastMCP framework
-
-        # Verify the tools have the correct function signatures
-
-        # Check save_plan
-        sig = inspect.signature(save_plan)
-        assert "plan_id" in sig.parameters
-        assert "plan" in sig.parameters
-
-        # Check mark_plan_as_completed
-        sig = inspect.signature(mark_plan_as_completed)
-        assert "plan_id" in sig.parameters
-        assert "step_id" in sig.parameters
-
-        # Check save_result
-        sig = inspect.signature(save_result)
-        assert "plan_id" in sig.parameters
-        assert "agent_name" in sig.parameters
-        assert "step_id" in sig.parameters
-        assert "description" in sig.parameters
-        assert "result" in sig.parameters
+    async def test_mcp_lifespan_concurrent_sessions(self):
+        """Test the scheduler outlives the first of two overlapping sessions."""
+        try:
+            async with lifespan(mcp):
+                async with lifespan(mcp):
+                    assert scheduler.running
+
+                # the first session to close leaves the sweep running
+                assert scheduler.running
+                assert scheduler.get_job("remove_stale_files") is not None
+
+            # AsyncIOScheduler.shutdown is scheduled on the event loop
+            await asyncio.sleep(0)
+            assert not scheduler.running
+        finally:
+            scheduler.remove_all_jobs()
+
+    async def test_mcp_lifespan_configures_once(self, idle_scheduler):
+        """Test a second session does not rebind the running scheduler."""
+        with patch.object(idle_scheduler, "configure") as mock_configure:
+            async with lifespan(mcp):
+                async with lifespan(mcp):
+                    pass
 
-        # Check save_context_description
-        sig = inspect.signature(save_context_description)
-        assert "plan_id" in sig.parameters
-        assert "file_path_or_url" in sig.parameters
-        assert "description" in sig.parameters
+        mock_configure.assert_called_once_with(event_loop=asyncio.get_running_loop())
+        idle_scheduler.start.assert_called_once()
+        idle_scheduler.shutdown.assert_called_once()
 
-        # Check get_blackboard
-        sig = inspect.signature(get_blackboard)
-        assert "plan_id" in sig.parameters
+    async def test_mcp_lifespan_shuts_down_on_error(self):
+        """Test the scheduler is shut down when the server exits with an error."""
 
-        # Check get_plan
-        sig = inspect.signature(get_plan)
-        assert "plan_id" in sig.parameters
+        with (
+            patch.object(scheduler, "add_job"),
+            patch.object(scheduler, "start"),
+            patch.object(scheduler, "shutdown") as mock_shutdown,
+        ):
+            with pytest.raises(RuntimeError):
+                async with lifespan(mcp):
+                    raise RuntimeError("server crashed")
 
-        # Check get_result
-        sig = inspect.signature(get_result)
-        assert "plan_id" in sig.parameters
-        assert "agent_name" in sig.parameters
-        assert "step_id" in sig.parameters
+            mock_shutdown.assert_called_once()
 
-        # Check get_context
-        sig = inspect.signature(get_context)
-        assert "file_path_or_url" in sig.parameters
-        assert "use_cache" in sig.parameters
+    @pytest.mark.parametrize(
+        ("tool", "parameters"),
+        [
+            (save_plan, {"plan_id", "plan"}),
+            (mark_plan_as_completed, {"plan_id", "step_id"}),
+            (mark_plan_steps_as_completed, {"plan_id", "step_ids"}),
+            (
+                save_result,
+                {"plan_id", "agent_name", "step_id", "description", "result"},
+            ),
+            (save_results, {"plan_id", "entries"}),
+            (save_context_description, {"plan_id", "file_path_or_url", "description"}),
+            (get_blackboard, {"plan_id"}),
+            (get_plan, {"plan_id"}),
+            (get_result, {"plan_id", "agent_name", "step_id"}),
+            (get_results, {"plan_id", "steps"}),
+            (get_context, {"file_path_or_url", "use_cache"}),
+            (get_contexts, {"file_paths_or_urls", "use_cache"}),
+        ],
+        ids=lambda value: getattr(value, "__name__", None) or ",".join(sorted(value)),
+    )
+    def test_mcp_server_tools_registered(self, tool, parameters):
+        """Test that each tool keeps the parameters its clients send."""
+        # The actual tool registration is handled by the FastMCP framework
+        assert parameters <= inspect.signature(tool).parameters.keys()
 
 
 class TestSchedulerConfiguration:
     """Test the background scheduler configuration."""
 
-    @patch("server.BackgroundScheduler")
+    @patch("server.AsyncIOScheduler")
     @patch("server.CronTrigger")
     def test_scheduler_setup(self, mock_cron_trigger, mock_scheduler_class):
         """Test that the scheduler is configured correctly."""
@@ -614,8 +673,6 @@ class TestSchedulerConfiguration:
         # Note: Since the scheduler is already initialized when the module loads,
         # we need to test the actual scheduler instance that was created
 
-        from server import scheduler
-
         # Verify scheduler exists and is the correct type
         assert scheduler is not None
         assert hasattr(scheduler, "start")
@@ -624,53 +681,21 @@ class TestSchedulerConfiguration:
 
     def test_scheduler_trigger_configuration(self):
         """Test that the cron trigger is configured correctly."""
-        from server import trigger
 
         # Verify trigger is configured for hourly execution
         assert trigger is not None
         # Note: The trigger is configured to run at minute=0 (every hour)
 
-    def test_scheduler_is_started(self):
-        """Test that the scheduler is started."""
-        from server import scheduler
+    def test_scheduler_not_started_on_import(self):
+        """Test that importing the server does not start the scheduler."""
 
-        # Verify the scheduler is running
-        # Note: The scheduler.start() is called at module load time
-        assert scheduler is not None
+        # Note: The scheduler.start() is called by the server lifespan
+        assert not scheduler.running
 
 
 class TestSavePlanToolErrorHandling:
     """Test error handling in the save_plan MCP tool."""
 
-    @pytest.mark.asyncio
-    @patch("server.write_plan")
-    async def test_save_plan_invalid_json_string(self, mock_write_plan):
-        """Test save_plan with invalid JSON string."""
-        mock_write_plan.return_value = "Plan saved successfully"
-
-        invalid_json = '{"id": 1, "goal": "test"'  # Missing closing brace
-
-        with pytest.raises(ValueError, match="Plan must be a JSON-serializable object"):
-            await save_plan("plan123", invalid_json)
-
-    @pytest.mark.asyncio
-    @patch("server.write_plan")
-    async def test_save_plan_invalid_dict_structure(self, mock_write_plan):
-        """Test save_plan with dict that doesn't match Plan model."""
-        mock_write_plan.return_value = "Plan saved successfully"
-
-        invalid_plan = {"invalid_field": "value"}  # Doesn't match Plan model
-
-        with pytest.raises(ValueError, match="Plan must be a JSON-serializable object"):
-            await save_plan("plan123", invalid_plan)
-
-    @pytest.mark.asyncio
-    async def test_save_plan_invalid_type(self):
-        """Test save_plan with invalid type (not dict or str)."""
-        with pytest.raises(ValueError, match="Plan must be a JSON-serializable object"):
-            await save_plan("plan123", 123)  # Invalid type
-
-    @pytest.mark.asyncio
     @patch("server.write_plan")
     async def test_save_plan_valid_json_string(self, mock_write_plan):
         """Test save_plan with valid JSON string."""
@@ -683,7 +708,6 @@ class TestSavePlanToolErrorHandling:
         assert result == "Plan saved successfully"
         mock_write_plan.assert_called_once()
 
-    @pytest.mark.asyncio
     @patch("server.write_plan")
     async def test_save_plan_valid_dict(self, mock_write_plan):
         """Test save_plan with valid dict."""
@@ -697,111 +721,76 @@ class TestSavePlanToolErrorHandling:
         mock_write_plan.assert_called_once()
 
 
-class TestRemoveStaleFilesErrorHandling:
-    """Test error handling in the remove_stale_files function."""
-
-    @patch("server.get_app_config")
-    @patch("server.get_filesystem")
-    def test_remove_stale_files_filesystem_error(
-        self, mock_get_filesystem, mock_get_app_config
-    ):
-        """Test remove_stale_files with filesystem error."""
-        # Setup mocks
-        mock_config = Mock()
-        mock_config.cache_path = "file:///tmp/cache"
-        mock_get_app_config.return_value = mock_config
-
-        mock_fs = Mock()
-        mock_fs.listdir.side_effect = OSError("Permission denied")
-        mock_get_filesystem.return_value = mock_fs
-
-        # Should not raise an exception, but handle errors gracefully
-        with pytest.raises(OSError):
-            remove_stale_files(3600)
-
-    @patch("server.get_app_config")
-    @patch("server.get_filesystem")
-    @patch("server.get_file_age")
-    def test_remove_stale_files_with_old_files(
-        self, mock_get_file_age, mock_get_filesystem, mock_get_app_config
-    ):
-        """Test remove_stale_files removes old files."""
-        # Setup mocks
-        mock_config = Mock()
-        mock_config.cache_path = "file:///tmp/cache"
-        mock_get_app_config.return_value = mock_config
-
-        mock_fs = Mock()
-        file_info = {"name": "old_file.txt"}
-        mock_fs.listdir.return_value = [file_info]
-        mock_get_filesystem.return_value = mock_fs
-
-        # File is older than max_age
-        mock_get_file_age.return_value = 7200  # 2 hours old
-
-        remove_stale_files(3600)  # max_age = 1 hour
-
-        # Verify old file was removed
-        mock_fs.rm.assert_called_once_with("old_file.txt")
-
-    @patch("server.get_app_config")
-    @patch("server.get_filesystem")
-    @patch("server.get_file_age")
-    def test_remove_stale_files_keeps_new_files(
-        self, mock_get_file_age, mock_get_filesystem, mock_get_app_config
-    ):
-        """Test remove_stale_files keeps new files."""
-        # Setup mocks
-        mock_config = Mock()
-        mock_config.cache_path = "file:///tmp/cache"
-        mock_get_app_config.return_value = mock_config
-
-        mock_fs = Mock()
-        file_info = {"name": "new_file.txt"}
-        mock_fs.listdir.return_value = [file_info]
-        mock_get_filesystem.return_value = mock_fs
-
-        # File is newer than max_age
-        mock_get_file_age.return_value = 1800  # 30 minutes old
-
-        remove_stale_files(3600)  # max_age = 1 hour
-
-        # Verify new file was not removed
-        mock_fs.rm.assert_not_called()
-
-
 class TestSchedulerLifecycle:
     """Test scheduler and lifespan functionality."""
 
-    @pytest.mark.asyncio
-    async def test_lifespan_shutdown_called(self):
-        """Test that lifespan properly shuts down scheduler."""
-        from server import lifespan, scheduler
-
-        with patch.object(scheduler, "shutdown") as mock_shutdown:
-            # Test the lifespan context manager
-            async with lifespan(mcp):
-                pass  # Context manager should yield
-
-            # Verify shutdown was called when exiting context
-            mock_shutdown.assert_called_once()
-
-    def test_scheduler_job_configuration(self):
-        """Test that scheduler has the correct job configuration."""
-        from server import scheduler
-
-        # Verify scheduler has jobs
-        jobs = scheduler.get_jobs()
-        assert len(jobs) > 0
-
-        # Find the remove_stale_files job
-        stale_files_job = None
-        for job in jobs:
-            if "remove_stale_files" in str(job.func):
-                stale_files_job = job
-                break
-
-        assert stale_files_job is not None
-
-        # Verify it's configured to run hourly (minute=0)
-        assert hasattr(stale_files_job.trigger, "fields")
+    async def test_scheduler_job_configuration(self, idle_scheduler):
+        """Test the lifespan schedules the sweep at the top of every hour."""
+
+        async with lifespan(mcp):
+            job = idle_scheduler.get_job("remove_stale_files")
+
+        assert job.func is remove_stale_files_job
+        minute = job.trigger.fields[job.trigger.FIELD_NAMES.index("minute")]
+        assert str(minute) == "0"
+        idle_scheduler.start.assert_called_once()
+        idle_scheduler.shutdown.assert_called_once()
+
+
+class TestEventLoopOffload:
+    """Test blocking calls are run in a worker thread, not on the event loop."""
+
+    @pytest.mark.parametrize(
+        ("call", "helper"),
+        [
+            pytest.param(
+                lambda: get_blackboard("plan123"),
+                "fetch_blackboard",
+                id="get_blackboard",
+            ),
+            pytest.param(lambda: get_plan("plan123"), "fetch_plan", id="get_plan"),
+            pytest.param(
+                lambda: get_result("plan123", "agent1", 1),
+                "fetch_result",
+                id="get_result",
+            ),
+            pytest.param(
+                lambda: get_results("plan123", [(1, "agent1")]),
+                "fetch_results",
+                id="get_results",
+            ),
+            pytest.param(
+                lambda: save_result("plan123", "agent1", 1, "Result", "{}"),
+                "write_result",
+                id="save_result",
+            ),
+            pytest.param(
+                lambda: mark_plan_as_completed("plan123", 1),
+                "update_plan_status",
+                id="mark_plan_as_completed",
+            ),
+            pytest.param(
+                lambda: get_context("https://example.com/doc.html"),
+                "fetch_context",
+                id="get_context",
+            ),
+            pytest.param(
+                remove_stale_files_job,
+                "remove_stale_files",
+                id="remove_stale_files_job",
+            ),
+        ],
+    )
+    async def test_runs_off_event_loop(self, call, helper):
+        """Test the blocking helper behind a coroutine runs in a worker thread."""
+        loop_thread = threading.get_ident()
+        helper_threads = []
+
+        def record(*args):
+            helper_threads.append(threading.get_ident())
+            return "ok"
+
+        with patch(f"server.{helper}", side_effect=record):
+            await call()
+
+        assert helper_threads and helper_threads[0] != loop_thread